@@ -17,7 +17,8 @@ setup(
     ],
     entry_points={
         "console_scripts": [
-            "CodeGrav=code_grav.main:main"
+            "CodeGrav=code_grav.main:main",
+            "CodeGrav-bench=code_grav.bench:main",
         ]
     },
     python_requires='>=3.12',
@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable
+
+from code_grav import file_manager, snapshot
+from code_grav.app import Window
+from code_grav.camera import camera
+from code_grav.generator import generate_space
+from code_grav.preview import evaluate_parallel, evaluate_space
+from code_grav.render import draw_space
+from code_grav.space import Space, iter_spaces
+from code_grav.space_types import Node
+
+
+class Benchmark:
+    def __init__(self, name: str, setup: Callable[[], object], run: Callable[[object], None]):
+        self.name = name
+        self.setup = setup
+        self.run = run
+
+
+def measure(benchmark: Benchmark, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        state = benchmark.setup()
+        start = time.perf_counter()
+        benchmark.run(state)
+        times.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': statistics.median(times), 'min_ms': min(times), 'repeat': repeat}
+
+
+def count_nodes(space: Space) -> int:
+    return sum(len(s.nodes) for s in iter_spaces(space))
+
+
+def memory_per_node(params: dict) -> float:
+    tracemalloc.start()
+    space = generate_space(**params)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / count_nodes(space)
+
+
+def get_benchmarks(params: dict, workdir: str, executor: Executor) -> list[Benchmark]:
+    filepath = os.path.join(workdir, 'bench.cg')
+    file_manager.save(generate_space(**params), filepath)
+    rnd = random.Random(params['seed'])
+
+    def top_level_nodes(space: Space) -> list[Node]:
+        return [n for n in space.nodes.values() if n is not space.input_node and n is not space.output_node]
+
+    def group(space: Space):
+        nodes = top_level_nodes(space)
+        space.new_subspace_from_nodes(0, 0, [n.id for n in nodes[:len(nodes) // 2]])
+
+    def delete(space: Space):
+        nodes = top_level_nodes(space)
+        for node in rnd.sample(nodes, min(100, len(nodes))):
+            space.del_node(node)
+
+    def hit_test(space: Space):
+        window = Window.get()
+        event = argparse.Namespace()
+        for _ in range(100):
+            event.pos = (rnd.randrange(window.width), rnd.randrange(window.height))
+            space.was_select_rect(event)
+
+    new_space = lambda: generate_space(**params)
+    return [
+        Benchmark('save', new_space, lambda space: file_manager.save(space, filepath)),
+        Benchmark('load', lambda: None, lambda _: file_manager.load_or_new(filepath)),
+        Benchmark('space_to_def', new_space, file_manager.space_to_def),
+        Benchmark('new_subspace_from_nodes', new_space, group),
+        Benchmark('del_node x100', new_space, delete),
+        Benchmark('hit_test x100', new_space, hit_test),
+        Benchmark('evaluate', new_space, lambda space: evaluate_space(space, {})),
+        Benchmark('evaluate_parallel', new_space, lambda space: evaluate_parallel(space, {}, executor)),
+    ]
+
+
+def run(params: dict, repeat: int, workers: int) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir, ThreadPoolExecutor(workers) as executor:
+        for benchmark in get_benchmarks(params, workdir, executor):
+            results[benchmark.name] = measure(benchmark, repeat)
+            print(f'{benchmark.name}: {results[benchmark.name]["median_ms"]:.2f} ms', file=sys.stderr)
+    results['memory_per_node'] = {'bytes': memory_per_node(params)}
+    return {'params': params, 'workers': workers, 'results': results}
+
+
+def render_bench(sizes: list[int], edge_density: float, frames: int) -> dict:
+    surface = Window.get().surface
+    results = {}
+    for size in sizes:
+        space = generate_space(nodes=size, edge_density=edge_density, depth=0, subspaces=0, self_spaces=2)
+        camera.x, camera.y = snapshot.world_bounds(space).center
+        paths: dict[str, list] = defaultdict(list)
+        for obj in space.objects:
+            paths[type(obj).__name__].append(obj)
+            if isinstance(obj, Node):
+                for pin in obj.pins:
+                    paths[type(obj).__name__ + '.' + type(pin).__name__].append(pin)
+        size_results = {}
+        for name, objects in sorted(paths.items()):
+            start = time.perf_counter()
+            for _ in range(frames):
+                for obj in objects:
+                    obj.draw(surface)
+            elapsed = (time.perf_counter() - start) * 1000 / frames
+            size_results[name] = {'objects': len(objects), 'ms_per_frame': elapsed}
+            print(f'{size} nodes, {name} x{len(objects)}: {elapsed:.2f} ms/frame', file=sys.stderr)
+        start = time.perf_counter()
+        for _ in range(frames):
+            draw_space(surface, space)
+        size_results['draw_space'] = {
+            'objects': len(space.nodes) + len(space.edges),
+            'ms_per_frame': (time.perf_counter() - start) * 1000 / frames,
+        }
+        results[f'{size} nodes, {len(space.edges)} edges'] = size_results
+    return results
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if not base:
+            continue
+        key = 'median_ms' if 'median_ms' in result else 'bytes'
+        ratio = result[key] / base[key] if base[key] else 1.0
+        flag = 'REGRESSION' if ratio > 1 + threshold else 'ok'
+        print(f'{name}: {base[key]:.2f} -> {result[key]:.2f} ({ratio:.2f}x) {flag}')
+        if flag != 'ok':
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='CodeGrav-bench')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the benchmarks and write JSON results')
+    run_parser.add_argument('--out', default='bench.json')
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--nodes', type=int, default=2000)
+    run_parser.add_argument('--edge-density', type=float, default=1.5)
+    run_parser.add_argument('--depth', type=int, default=2)
+    run_parser.add_argument('--subspaces', type=int, default=4)
+    run_parser.add_argument('--self-spaces', type=int, default=2)
+    run_parser.add_argument('--pins', type=int, default=2)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--workers', type=int, default=os.cpu_count(), help='pool size for evaluate_parallel')
+    render_parser = commands.add_parser('render', help='measure headless draw cost per draw path')
+    render_parser.add_argument('--out', default='render.json')
+    render_parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000])
+    render_parser.add_argument('--edge-density', type=float, default=1.5)
+    render_parser.add_argument('--frames', type=int, default=10)
+    compare_parser = commands.add_parser('compare', help='compare results against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    if args.command == 'run':
+        params = {
+            'nodes': args.nodes,
+            'edge_density': args.edge_density,
+            'depth': args.depth,
+            'subspaces': args.subspaces,
+            'self_spaces': args.self_spaces,
+            'pins': args.pins,
+            'seed': args.seed,
+        }
+        with open(args.out, 'w') as f:
+            json.dump(run(params, args.repeat, args.workers), f, indent=2)
+    elif args.command == 'render':
+        with open(args.out, 'w') as f:
+            json.dump(render_bench(args.sizes, args.edge_density, args.frames), f, indent=2)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        if compare(baseline, current, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
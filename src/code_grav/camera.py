@@ -1,13 +1,40 @@
+from functools import cached_property
+
 from code_grav.app import Window
 
 
 class Camera:
     def __init__(self):
-        self.x = 0
-        self.y = 0
-        window = Window().get()
-        self.half_w = window.width / 2
-        self.half_h = window.height / 2
+        self._x = 0
+        self._y = 0
+        # bumped on every move; window rects cached for an older version are stale
+        self.version = 0
+
+    @property
+    def x(self) -> float:
+        return self._x
+
+    @x.setter
+    def x(self, value: float):
+        self._x = value
+        self.version += 1
+
+    @property
+    def y(self) -> float:
+        return self._y
+
+    @y.setter
+    def y(self, value: float):
+        self._y = value
+        self.version += 1
+
+    @cached_property
+    def half_w(self) -> float:
+        return Window.get().half_width
+
+    @cached_property
+    def half_h(self) -> float:
+        return Window.get().half_height
 
     def window_to_world(self, mouse_x: int, mouse_y: int) -> tuple[float, float]:
         x = mouse_x - self.half_w
@@ -0,0 +1,81 @@
+from code_grav.file_manager import dict_to_node, edge_to_dict, node_to_dict
+from code_grav.nodes import Input, Output
+from code_grav.space import Space, Edge
+from code_grav.space_types import Node
+from code_grav.utils import get_pin_by_name
+
+_clipboard: dict | None = None
+
+
+def copy_nodes(space: Space, nodes: list[Node]) -> bool:
+    global _clipboard
+    # in dependency order, so the pasted edges never make the order move anything
+    nodes = sorted((node for node in nodes if not isinstance(node, (Input, Output))), key=space.order.position)
+    if not nodes:
+        return False
+    ids = {node.id for node in nodes}
+    _clipboard = {
+        'x': sum(node.x for node in nodes) / len(nodes),
+        'y': sum(node.y for node in nodes) / len(nodes),
+        'nodes': [node_to_dict(node) for node in nodes],
+        'edges': [
+            edge_to_dict(edge) for edge in space.edges
+            if edge.start.node.id in ids and edge.end.node.id in ids
+        ],
+    }
+    return True
+
+
+def collect_ids(data: dict, ids: list[int]):
+    for node in data['nodes']:
+        ids.append(node['id'])
+        if 'space' in node:
+            collect_ids(node['space'], ids)
+
+
+def remap(data: dict, mapping: dict[int, int]) -> dict:
+    return {
+        'nodes': [remap_node(node, mapping) for node in data['nodes']],
+        'edges': [
+            {
+                'start': {**edge['start'], 'node_id': mapping[edge['start']['node_id']]},
+                'end': {**edge['end'], 'node_id': mapping[edge['end']['node_id']]},
+            }
+            for edge in data['edges']
+        ],
+    }
+
+
+def remap_node(data: dict, mapping: dict[int, int]) -> dict:
+    data = {**data, 'id': mapping[data['id']]}
+    if 'space' in data:
+        data['space'] = remap(data['space'], mapping)
+    return data
+
+
+def paste_nodes(space: Space, x: float, y: float) -> tuple[list[Node], list[Edge]]:
+    if _clipboard is None:
+        return [], []
+    # every id of the block, nested spaces included, comes from one reservation
+    old_ids = []
+    collect_ids(_clipboard, old_ids)
+    data = remap(_clipboard, dict(zip(old_ids, space.ids.reserve(len(old_ids)))))
+    dx, dy = round(x - _clipboard['x']), round(y - _clipboard['y'])
+    nodes = []
+    for node_data in data['nodes']:
+        node_data['x'] += dx
+        node_data['y'] += dy
+        if node_data['name'] == 'SelfSpace':
+            # a SelfSpace always mirrors the space it is in
+            node_data['input_pins'] = [{'name': pin.name, 'title': pin.title} for pin in space.input_node.pins]
+            node_data['output_pins'] = [{'name': pin.name, 'title': pin.title} for pin in space.output_node.pins]
+        nodes.append(dict_to_node(space, node_data))
+    by_id = {node.id: node for node in nodes}
+    edges = []
+    for edge in data['edges']:
+        start = get_pin_by_name(by_id[edge['start']['node_id']].pins, edge['start']['pin_name'])
+        end = get_pin_by_name(by_id[edge['end']['node_id']].pins, edge['end']['pin_name'])
+        # a SelfSpace pasted into another space loses the pins the target lacks
+        if start is not None and end is not None:
+            edges.append(Edge(start, end))
+    return nodes, edges
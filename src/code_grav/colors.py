@@ -9,3 +9,13 @@ menu_bg = white
 menu_text = black
 pin_bg = white
 pin_text = black
+preview_text = (120, 200, 255)
+error_text = (200, 30, 30)
+heat_cold = (60, 90, 255)
+heat_hot = (255, 40, 40)
+stats_text = white
+stats_bg = black
+minimap_bg = (30, 30, 30)
+minimap_node = (170, 170, 170)
+minimap_edge = (90, 90, 90)
+minimap_view = white
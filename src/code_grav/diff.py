@@ -0,0 +1,116 @@
+import json
+from collections import defaultdict
+
+POSITION = ('x', 'y')
+
+EdgeKey = tuple[int, str, int, str]
+
+
+def edge_key(data: dict) -> EdgeKey:
+    return data['start']['node_id'], data['start']['pin_name'], data['end']['node_id'], data['end']['pin_name']
+
+
+def semantic(data: dict) -> dict:
+    return {key: value for key, value in data.items() if key not in POSITION and key != 'space'}
+
+
+def space_hash(data: dict) -> int:
+    hashes = {node['id']: node_hash(node) for node in data['nodes']}
+    edges = sorted(
+        (hashes[start], start_pin, hashes[end], end_pin)
+        for start, start_pin, end, end_pin in map(edge_key, data['edges'])
+    )
+    return hash((tuple(sorted(hashes.values())), tuple(edges)))
+
+
+def node_hash(data: dict) -> int:
+    # ids are left out, so a node that was only renumbered keeps its hash
+    content = semantic(data)
+    del content['id']
+    return hash((json.dumps(content, sort_keys=True), space_hash(data['space']) if 'space' in data else None))
+
+
+def same_kind(old: dict, new: dict) -> bool:
+    return old['name'] == new['name'] and ('space' in old) == ('space' in new)
+
+
+class SpaceDiff:
+    def __init__(self):
+        self.added: list[dict] = []
+        self.removed: list[int] = []
+        self.changed: dict[int, dict] = {}
+        self.previous: dict[int, dict] = {}
+        self.renamed: dict[int, int] = {}
+        self.moved: dict[int, tuple[int, int]] = {}
+        self.added_edges: list[EdgeKey] = []
+        self.removed_edges: list[EdgeKey] = []
+        self.spaces: dict[int, 'SpaceDiff'] = {}
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.added or self.removed or self.changed or self.moved
+            or self.added_edges or self.removed_edges or self.spaces or self.renamed
+        )
+
+
+def diff_spaces(old: dict, new: dict, rename: bool = False) -> SpaceDiff:
+    diff = SpaceDiff()
+    old_nodes = {data['id']: data for data in old['nodes']}
+    replaced = set()
+    for data in new['nodes']:
+        node_id = data['id']
+        old_data = old_nodes.get(node_id)
+        if old_data is None:
+            diff.added.append(data)
+            continue
+        if not same_kind(old_data, data):
+            # a node that changed its kind is rebuilt, together with its edges
+            replaced.add(node_id)
+            diff.removed.append(node_id)
+            diff.added.append(data)
+            continue
+        if semantic(old_data) != semantic(data):
+            diff.changed[node_id] = data
+            diff.previous[node_id] = old_data
+        if (old_data['x'], old_data['y']) != (data['x'], data['y']):
+            diff.moved[node_id] = data['x'], data['y']
+        if 'space' in data:
+            child = diff_spaces(old_data['space'], data['space'], rename)
+            if child:
+                diff.spaces[node_id] = child
+    new_ids = {data['id'] for data in new['nodes']}
+    removed = [node_id for node_id in old_nodes if node_id not in new_ids]
+    if rename and removed and diff.added:
+        match_renamed(diff, [old_nodes[node_id] for node_id in removed])
+        removed = [node_id for node_id in removed if node_id not in diff.renamed]
+    diff.removed.extend(removed)
+
+    renamed = diff.renamed
+    old_edges = {}
+    for key in map(edge_key, old['edges']):
+        start, start_pin, end, end_pin = key
+        old_edges[renamed.get(start, start), start_pin, renamed.get(end, end), end_pin] = key
+    new_edges = dict.fromkeys(edge_key(data) for data in new['edges'])
+    diff.removed_edges = [
+        key for mapped, key in old_edges.items()
+        if mapped not in new_edges or mapped[0] in replaced or mapped[2] in replaced
+    ]
+    diff.added_edges = [
+        key for key in new_edges
+        if key not in old_edges or key[0] in replaced or key[2] in replaced
+    ]
+    return diff
+
+
+def match_renamed(diff: SpaceDiff, removed: list[dict]):
+    candidates: dict[int, list[int]] = defaultdict(list)
+    for data in removed:
+        candidates[node_hash(data)].append(data['id'])
+    added = []
+    for data in diff.added:
+        ids = candidates.get(node_hash(data))
+        if ids:
+            diff.renamed[ids.pop()] = data['id']
+        else:
+            added.append(data)
+    diff.added = added
@@ -0,0 +1,82 @@
+import time
+
+import pygame
+from pygame import Surface
+
+from code_grav import colors
+from code_grav.nodes import Const, If, Operator
+from code_grav.preview import evaluate_space
+from code_grav.space_types import Node, SpaceProtocol
+
+
+class NodeStats:
+    def __init__(self, label: str):
+        self.label = label
+        self.calls = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+
+
+class EvalProfile:
+    def __init__(self):
+        self.stats: dict[tuple[int, ...], NodeStats] = {}
+        self._stack: list[tuple[tuple[int, ...], float, list[float]]] = []
+
+    def enter(self, node: Node):
+        parent = self._stack[-1][0] if self._stack else ()
+        path = parent + (node.id,)
+        if path not in self.stats:
+            self.stats[path] = NodeStats(node_label(node))
+        self._stack.append((path, time.perf_counter(), [0.0]))
+
+    def leave(self):
+        path, start, children = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        stats = self.stats[path]
+        stats.calls += 1
+        stats.inclusive += elapsed
+        stats.exclusive += elapsed - children[0]
+        if self._stack:
+            self._stack[-1][2][0] += elapsed
+
+    def top_level(self) -> dict[int, NodeStats]:
+        return {path[0]: stats for path, stats in self.stats.items() if len(path) == 1}
+
+    def write_folded(self, filepath: str):
+        with open(filepath, 'w') as f:
+            for path, stats in self.stats.items():
+                stack = ';'.join(self.stats[path[:i]].label for i in range(1, len(path) + 1))
+                f.write(f'{stack} {round(stats.exclusive * 1_000_000)}\n')
+
+
+def node_label(node: Node) -> str:
+    if isinstance(node, (Const, If, Operator)):
+        return f'{type(node).__name__}[{node.value}]#{node.id}'
+    return f'{type(node).__name__}#{node.id}'
+
+
+def profile_space(space: SpaceProtocol) -> EvalProfile:
+    profile = EvalProfile()
+    evaluate_space(space, {}, profile=profile)
+    return profile
+
+
+def heat_color(ratio: float) -> tuple[int, int, int]:
+    ratio = min(max(ratio, 0.0), 1.0)
+    cold, hot = colors.heat_cold, colors.heat_hot
+    return (
+        int(cold[0] + (hot[0] - cold[0]) * ratio),
+        int(cold[1] + (hot[1] - cold[1]) * ratio),
+        int(cold[2] + (hot[2] - cold[2]) * ratio),
+    )
+
+
+def draw_heatmap(surface: Surface, space: SpaceProtocol, profile: EvalProfile):
+    top_level = profile.top_level()
+    if not top_level:
+        return
+    max_time = max(stats.inclusive for stats in top_level.values()) or 1
+    for node_id, stats in top_level.items():
+        node = space.nodes.get(node_id)
+        if node:
+            pygame.draw.rect(surface, heat_color(stats.inclusive / max_time), node.select_rect(), 3)
@@ -1,20 +1,35 @@
+import os
 import sys
+from collections import defaultdict
 from enum import StrEnum
+from typing import Callable
 
 import pygame
 
-from code_grav import colors, file_manager
+from code_grav import clipboard, colors, file_manager
 from code_grav.app import Window
 from code_grav.camera import camera
+from code_grav.diff import diff_spaces
+from code_grav.frame_stats import frame_stats
+from code_grav.layout import auto_layout, place_nodes
+from code_grav.loader import ProgressiveLoader
+from code_grav.minimap import minimap
+from code_grav.eval_profile import EvalProfile, profile_space, draw_heatmap
+from code_grav.history import history, AddNode, AddNodes, DelNodes, DelEdges, Connect, MoveNodes, NewSubSpace, SetPositions
 from code_grav.nodes import SubSpace, Const, Operator, If, SelfSpace
-from code_grav.render import draw_dashed_rect, draw_button, draw_link, draw_flexible_button
+from code_grav.preview import Preview
+from code_grav.profiling import SessionProfiler
+from code_grav.recorder import Recorder
+from code_grav.render import draw_dashed_rect, draw_button, draw_link, draw_flexible_button, draw_arrow
 from code_grav.space_manager import SpaceManager
-from code_grav.space_types import Node, BasePin
+from code_grav.space_types import Node, BasePin, BaseEdge
 from code_grav.utils import normalize_rect, get_common_center
+from code_grav.watcher import FileWatcher
+from code_grav.workspace import current_workspace
 
 
 DOUBLE_CLICK_THRESHOLD = 500
-_CLICK_TIME = 0
+DOUBLECLICK = pygame.event.custom_type()
 
 
 class DragType(StrEnum):
@@ -22,33 +37,106 @@ class DragType(StrEnum):
     object = 'object'
     rect = 'rect'
     link = 'link'
+    minimap = 'minimap'
+
+
+class DoubleClick:
+    def __init__(self, threshold: int = DOUBLE_CLICK_THRESHOLD):
+        self.threshold = threshold
+        self._button: int | None = None
+        self._time = 0
+
+    def feed(self, event, now: int) -> bool:
+        is_double = event.button == self._button and now - self._time < self.threshold
+        self._button = None if is_double else event.button
+        self._time = now
+        return is_double
+
+
+def get_event_detail(event) -> int | None:
+    if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, DOUBLECLICK):
+        return event.button
+    if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+        return event.key
+    return None
 
 
 class EventStorage:
     def __init__(self):
-        self._events = []
+        self._rules: dict[tuple[int, int | None], list[tuple[int, Callable | None, Callable]]] = defaultdict(list)
+        self._dispatch: dict[tuple[int, int | None], list[tuple[Callable | None, Callable]]] = {}
+        self._double_click = DoubleClick()
+        self._count = 0
+
+    def rule(self, event_type: int, details: int | list[int] | None = None, condition: Callable | None = None):
+        if not isinstance(details, list):
+            details = [details]
 
-    def rule(self, condition):
         def decorator(func):
-            self._events.append((condition, func))
+            self._count += 1
+            for detail in details:
+                self._rules[event_type, detail].append((self._count, condition, func))
+            self._dispatch.clear()
             return func
         return decorator
 
-    def trigger_events(self, event_self):
-        for event in pygame.event.get():
-            for condition, func in self._events:
-                if condition(event):
-                    func(event_self, event)
+    def _get_handlers(self, key: tuple[int, int | None]) -> list[tuple[Callable | None, Callable]]:
+        handlers = self._dispatch.get(key)
+        if handlers is None:
+            rules = self._rules.get(key, [])
+            if key[1] is not None:
+                rules = rules + self._rules.get((key[0], None), [])
+            handlers = [(condition, func) for _, condition, func in sorted(rules, key=lambda r: r[0])]
+            self._dispatch[key] = handlers
+        return handlers
+
+    def trigger_events(self, event_self, events: list, now: int):
+        for i, event in enumerate(events):
+            if event.type == pygame.MOUSEMOTION and i + 1 < len(events) and events[i + 1].type == pygame.MOUSEMOTION:
+                continue
+            self.dispatch(event_self, event)
+            if event.type == pygame.MOUSEBUTTONDOWN and self._double_click.feed(event, now):
+                self.dispatch(event_self, pygame.event.Event(DOUBLECLICK, pos=event.pos, button=event.button))
+
+    def dispatch(self, event_self, event):
+        for condition, func in self._get_handlers((event.type, get_event_detail(event))):
+            if condition is None or condition(event):
+                func(event_self, event)
 
 
 class EventManager:
-    def __init__(self, space_manager: SpaceManager, filepath: str | None):
+    def __init__(self, space_manager: SpaceManager, filepath: str | None, profiler: SessionProfiler):
         self.space_manager = space_manager
+        self.preview = Preview()
+        self.recorder: Recorder | None = None
+        self.profiler = profiler
+        self.watcher = FileWatcher(filepath) if filepath else None
+        self.loader: ProgressiveLoader | None = None
         self._main = MainEvents(self, space_manager, filepath)
         self._current = self._main
 
-    def trigger_events(self):
-        self._current.trigger_events()
+    def trigger_events(self, events: list | None = None, now: int | None = None):
+        if events is None:
+            events = pygame.event.get()
+        if now is None:
+            now = pygame.time.get_ticks()
+        if self.recorder:
+            self.recorder.record(events, now)
+        if self.loader:
+            with frame_stats.phase('load'):
+                nodes, edges = self.loader.update()
+            for node in nodes:
+                self.preview.node_added(node)
+            for edge in edges:
+                self.preview.edge_added(edge)
+        elif self.watcher and self.watcher.changed(now):
+            self._main.reload()
+        self._current.trigger_events(events, now)
+        if self.loader:
+            self.loader.draw(Window.get().surface)
+            if self.loader.finished:
+                self.loader = None
+                self._main.base = file_manager.space_to_dict(self.space_manager.root_space)
 
     def switch_to_main(self):
         self._current = self._main
@@ -73,52 +161,116 @@ class MainEvents:
         self.window = Window.get()
         self.start_drag_pos = None
         self.drag_type: DragType | None = None
+        self.drag_origin = None
+        self.drag_nodes: list[Node] = []
         self.selected_objects: list[Node] = []
+        self.selected_edges: list[BaseEdge] = []
         self.selected_rect = None
         self.link_drag_start: pygame.Rect | None = None
         self.link_drag_pin: BasePin | None = None
         self.filepath = filepath
+        # the program as last loaded or saved; a change on disk is applied relative to it
+        self.base = file_manager.space_to_dict(space_manager.root_space) if filepath else None
+        self.profile: EvalProfile | None = None
+        self.search_results: list[int] = []
+        self.search_position = 0
+
+    def trigger_events(self, events: list, now: int):
+        with frame_stats.phase('events'):
+            self.event.trigger_events(self, events, now)
+        with frame_stats.phase('preview'):
+            self.event_manager.preview.update(self.space_manager.space)
+        with frame_stats.phase('overlay'):
+            self.event_manager.preview.draw(self.window.surface)
+            if self.profile:
+                draw_heatmap(self.window.surface, self.space_manager.space, self.profile)
+            for obj in self.selected_objects:
+                pygame.draw.rect(self.window.surface, colors.white, obj.select_rect(), 4)
+            for edge in self.selected_edges:
+                draw_arrow(self.window.surface, edge.start.select_rect(), edge.end.select_rect(), 5, 10, colors.white)
+            if self.selected_rect:
+                draw_dashed_rect(self.window.surface, colors.white, self.selected_rect, 1, 10)
+            if self.link_drag_start:
+                draw_link(self.window.surface, self.link_drag_start, pygame.mouse.get_pos(), 5)
+        with frame_stats.phase('minimap'):
+            minimap.draw(self.window.surface, self.space_manager.space)
+
+    @property
+    def loading(self) -> bool:
+        # edges still to come refer to nodes by id, so the structure stays read-only until they are in
+        return self.event_manager.loader is not None
+
+    def reload(self):
+        try:
+            data = file_manager.read(self.filepath)
+        except file_manager.READ_ERRORS:
+            # the file is still being written; the next poll picks it up
+            return
+        self.event_manager.watcher.sync()
+        if diff_spaces(self.base, file_manager.space_to_dict(self.space_manager.root_space)):
+            # unsaved edits are never reverted; saving writes them over the file
+            print(f'CodeGrav: {self.filepath} changed on disk; keeping unsaved edits', file=sys.stderr)
+            return
+        changed = file_manager.reload(self.space_manager, self.base, data)
+        self.base = data
+        if changed:
+            # the undo stack refers to the program before the change on disk
+            history.clear()
+            self.event_manager.preview.reset()
+            self.selected_objects = []
+            self.selected_edges = []
+            self.profile = None
 
-    def trigger_events(self):
-        self.event.trigger_events(self)
-        for obj in self.selected_objects:
-            pygame.draw.rect(self.window.surface, colors.white, obj.select_rect(), 4)
-        if self.selected_rect:
-            draw_dashed_rect(self.window.surface, colors.white, self.selected_rect, 1, 10)
-        if self.link_drag_start:
-            draw_link(self.window.surface, self.link_drag_start, pygame.mouse.get_pos(), 5)
-
-    @event.rule(lambda e: e.type == pygame.QUIT)
+    @event.rule(pygame.QUIT)
     def event_game_exit(self, _):
         sys.exit()
 
-    @event.rule(lambda e: e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE)
+    @event.rule(pygame.KEYDOWN, pygame.K_ESCAPE)
     def event_escape(self, _):
         if self.space_manager.rollback():
             self.selected_objects = []
+            self.selected_edges = []
+            self.profile = None
         else:
             pygame.quit()
             sys.exit()
 
-    @event.rule(lambda e: e.type == pygame.MOUSEBUTTONUP and e.button == 1)
+    @event.rule(pygame.MOUSEBUTTONUP, 1)
     def event_select_node_or_link_point(self, event):
+        if self.drag_type == DragType.minimap:
+            return
         if self.selected_rect and max(self.selected_rect.width, self.selected_rect.height) > 5:
             return
         obj = self.space_manager.space.was_select_rect(event)
         if obj:
             self.selected_objects = [obj]
+            self.selected_edges = []
+            return
+        edge = self.space_manager.space.was_select_edge(event)
+        if edge:
+            self.selected_objects = []
+            self.selected_edges = [edge]
+
+    @event.rule(pygame.MOUSEBUTTONDOWN, 1, lambda e: minimap.hit(e.pos))
+    def event_minimap_jump(self, event):
+        if self.drag_type:
+            return
+        self.drag_type = DragType.minimap
+        minimap.jump(self.space_manager.space, event.pos)
 
-    @event.rule(lambda e: e.type == pygame.MOUSEBUTTONDOWN and e.button == 1)
+    @event.rule(pygame.MOUSEBUTTONDOWN, 1)
     def event_multi_select(self, event):
         if self.drag_type:
             return
         if self.space_manager.space.was_select_rect(event) in self.selected_objects:
             self.start_drag_pos = event.pos
             self.drag_type = DragType.object
+            self.drag_origin = event.pos
+            self.drag_nodes = list(self.selected_objects)
             self.selected_rect = None
             return
         result = self.space_manager.space.was_select_linked_rect(event)
-        if result:
+        if result and not self.loading:
             pin, rect = result
             self.link_drag_start = rect
             self.link_drag_pin = pin
@@ -127,49 +279,62 @@ class MainEvents:
             self.start_drag_pos = event.pos
             self.drag_type = DragType.rect
 
-    @event.rule(lambda e: e.type == pygame.MOUSEBUTTONDOWN and e.button == 2)
+    @event.rule(pygame.MOUSEBUTTONDOWN, 2)
     def event_drag(self, event):
         if not self.drag_type:
             self.start_drag_pos = event.pos
             self.drag_type = DragType.scene
 
-    @event.rule(lambda e: e.type == pygame.MOUSEBUTTONUP and e.button == 1)
+    @event.rule(pygame.MOUSEBUTTONUP, 1)
     def event_drop_left(self, event):
         if self.drag_type == DragType.rect and self.selected_rect:
-            self.selected_objects = []
-            for obj in self.space_manager.space.nodes.values():
-                if self.selected_rect.colliderect(obj.select_rect()):
-                    self.selected_objects.append(obj)
+            # a click that jittered by a few pixels was already handled as a click
+            if max(self.selected_rect.width, self.selected_rect.height) > 5:
+                self.selected_objects = []
+                self.selected_edges = []
+                for obj in self.space_manager.space.nodes.values():
+                    if self.selected_rect.colliderect(obj.select_rect()):
+                        self.selected_objects.append(obj)
         elif self.drag_type == DragType.link:
             result = self.space_manager.space.was_select_linked_rect(event)
-            if result:
+            if result and not self.space_manager.space.order.would_cycle(self.link_drag_pin.node, result[0].node):
                 pin, _ = result
-                self.space_manager.space.add_connect(self.link_drag_pin, pin)
+                command = history.do(Connect(self.space_manager.space, self.link_drag_pin, pin))
+                self.event_manager.preview.edge_added(command.edge)
+        elif self.drag_type == DragType.object and event.pos != self.drag_origin:
+            dx, dy = event.pos[0] - self.drag_origin[0], event.pos[1] - self.drag_origin[1]
+            history.push(MoveNodes(self.space_manager.space, self.drag_nodes, dx, dy))
+            self.space_manager.space.nodes_moved(self.drag_nodes)
         self.start_drag_pos = None
         self.drag_type = None
         self.selected_rect = None
         self.link_drag_start = None
         self.link_drag_pin = None
+        self.drag_origin = None
+        self.drag_nodes = []
 
-    @event.rule(lambda e: e.type == pygame.MOUSEBUTTONUP and e.button == 2)
+    @event.rule(pygame.MOUSEBUTTONUP, 2)
     def event_drop_center(self, _):
         self.start_drag_pos = None
         self.drag_type = None
         self.selected_rect = None
 
-    @event.rule(lambda e: e.type == pygame.MOUSEBUTTONUP and e.button == 3)
+    @event.rule(pygame.MOUSEBUTTONUP, 3)
     def event_drop_right(self, event):
+        if self.loading:
+            return
         was_select = self.space_manager.space.was_select_rect(event)
         if was_select:
             self.event_manager.switch_to_node_context_menu(was_select, *event.pos)
         else:
             self.event_manager.switch_to_space_context_menu(*event.pos)
         self.selected_objects = []
+        self.selected_edges = []
         self.start_drag_pos = None
         self.drag_type = None
         self.selected_rect = None
 
-    @event.rule(lambda e: e.type == pygame.MOUSEMOTION)
+    @event.rule(pygame.MOUSEMOTION)
     def event_move(self, event):
         if self.drag_type == DragType.scene:
             dx, dy = event.pos[0] - self.start_drag_pos[0], event.pos[1] - self.start_drag_pos[1]
@@ -182,42 +347,175 @@ class MainEvents:
             for obj in self.selected_objects:
                 obj.x += dx
                 obj.y += dy
+            # edges follow on drop, through nodes_moved
+            self.space_manager.space.overview.update(self.selected_objects)
+        elif self.drag_type == DragType.minimap:
+            minimap.jump(self.space_manager.space, event.pos)
         elif self.drag_type == DragType.rect:
             self.selected_rect = normalize_rect(pygame.Rect(
                 self.start_drag_pos,
                 (event.pos[0] - self.start_drag_pos[0], event.pos[1] - self.start_drag_pos[1]),
             ))
 
-    @event.rule(lambda e: e.type == pygame.KEYDOWN and e.key == pygame.K_g)
+    @event.rule(pygame.KEYDOWN, pygame.K_g)
     def event_create_subspace(self, _):
+        if self.loading:
+            return
         if not self.selected_objects:
             return
         x, y = get_common_center(self.selected_objects)
         x, y = camera.window_to_world(x, y)
-        ss = self.space_manager.space.new_subspace_from_nodes(x, y, [obj.id for obj in self.selected_objects])
-        self.selected_objects = [ss]
+        command = history.do(NewSubSpace(self.space_manager.space, x, y, [obj.id for obj in self.selected_objects]))
+        self.event_manager.preview.reset()
+        self.selected_objects = [command.sub_space]
+
+    @event.rule(pygame.KEYDOWN, pygame.K_l)
+    def event_layout(self, _):
+        space = self.space_manager.space
+        nodes = list(self.selected_objects or space.nodes.values())
+        old_positions = [(node.x, node.y) for node in nodes]
+        if self.selected_objects:
+            place_nodes(space, nodes)
+        else:
+            auto_layout(space)
+        space.nodes_moved(nodes)
+        history.push(SetPositions(space, nodes, old_positions))
 
-    @event.rule(lambda e: e.type == pygame.MOUSEBUTTONDOWN and is_double_click())
+    @event.rule(DOUBLECLICK)
     def event_enter_to_subspace(self, event):
+        if self.drag_type == DragType.minimap:
+            return
         obj = self.space_manager.space.was_select_rect(event)
-        if obj and isinstance(obj, SubSpace):
+        if obj and isinstance(obj, SubSpace) and obj.space is not None:
             self.space_manager.apply(obj)
             self.selected_objects = []
+            self.selected_edges = []
+            self.profile = None
 
-    @event.rule(lambda e: e.type == pygame.KEYDOWN and e.key in [pygame.K_BACKSPACE, pygame.K_DELETE])
+    @event.rule(pygame.KEYDOWN, [pygame.K_BACKSPACE, pygame.K_DELETE])
     def event_delete(self, _):
-        for node in self.selected_objects:
-            self.space_manager.space.del_node(node)
+        if self.loading:
+            return
+        if self.selected_edges:
+            history.do(DelEdges(self.space_manager.space, self.selected_edges))
+            self.event_manager.preview.nodes_removed([], self.selected_edges)
+            self.selected_edges = []
+            return
+        if not self.selected_objects:
+            return
+        command = history.do(DelNodes(self.space_manager.space, self.selected_objects))
+        self.event_manager.preview.nodes_removed(command.nodes, command.edges)
         self.selected_objects = []
+        self.selected_edges = []
+
+    @event.rule(pygame.KEYDOWN, pygame.K_c, lambda e: e.mod & pygame.KMOD_CTRL)
+    def event_copy(self, _):
+        clipboard.copy_nodes(self.space_manager.space, self.selected_objects)
+
+    @event.rule(pygame.KEYDOWN, pygame.K_x, lambda e: e.mod & pygame.KMOD_CTRL)
+    def event_cut(self, _):
+        if self.loading:
+            return
+        space = self.space_manager.space
+        nodes = [node for node in self.selected_objects if node not in (space.input_node, space.output_node)]
+        if not clipboard.copy_nodes(space, nodes):
+            return
+        command = history.do(DelNodes(space, nodes))
+        self.event_manager.preview.nodes_removed(command.nodes, command.edges)
+        self.selected_objects = []
+        self.selected_edges = []
+
+    @event.rule(pygame.KEYDOWN, pygame.K_v, lambda e: e.mod & pygame.KMOD_CTRL)
+    def event_paste(self, _):
+        if self.loading:
+            return
+        space = self.space_manager.space
+        nodes, edges = clipboard.paste_nodes(space, *camera.window_to_world(*pygame.mouse.get_pos()))
+        if not nodes:
+            return
+        history.do(AddNodes(space, nodes, edges))
+        preview = self.event_manager.preview
+        for node in nodes:
+            preview.node_added(node)
+        for edge in edges:
+            preview.edge_added(edge)
+        self.selected_objects = nodes
+        self.selected_edges = []
+
+    @event.rule(pygame.KEYDOWN, pygame.K_z, lambda e: e.mod & pygame.KMOD_CTRL)
+    def event_undo(self, event):
+        if event.mod & pygame.KMOD_SHIFT:
+            changed = history.redo()
+        else:
+            changed = history.undo()
+        if changed:
+            self.history_changed()
+
+    @event.rule(pygame.KEYDOWN, pygame.K_y, lambda e: e.mod & pygame.KMOD_CTRL)
+    def event_redo(self, _):
+        if history.redo():
+            self.history_changed()
 
-    @event.rule(lambda e: (
-            e.type == pygame.KEYDOWN
-            and e.key == pygame.K_s
-            and pygame.key.get_mods() & pygame.KMOD_CTRL
-    ))
+    def history_changed(self):
+        self.selected_objects = []
+        self.selected_edges = []
+        self.event_manager.preview.reset()
+        # undoing AddPin lays pins out again without going through nodes_moved
+        self.space_manager.space.edge_index.invalidate()
+        self.space_manager.space.overview.invalidate()
+
+    @event.rule(pygame.KEYDOWN, pygame.K_F3)
+    def event_toggle_stats(self, _):
+        frame_stats.toggle_overlay()
+
+    @event.rule(pygame.KEYDOWN, pygame.K_m)
+    def event_toggle_minimap(self, _):
+        minimap.toggle()
+
+    @event.rule(pygame.KEYDOWN, pygame.K_F9)
+    def event_toggle_session_profile(self, _):
+        self.event_manager.profiler.toggle()
+
+    @event.rule(pygame.KEYDOWN, pygame.K_p)
+    def event_toggle_profile(self, _):
+        if self.profile:
+            self.profile = None
+            return
+        self.profile = profile_space(self.space_manager.space)
+        if self.filepath:
+            self.profile.write_folded(os.path.splitext(self.filepath)[0] + '.folded')
+
+    @event.rule(pygame.KEYDOWN, pygame.K_f, lambda e: e.mod & pygame.KMOD_CTRL)
+    def event_find(self, _):
+        self.event_manager.switch_to_input(self.find)
+
+    @event.rule(pygame.KEYDOWN, pygame.K_TAB)
+    def event_find_next(self, _):
+        if self.search_results:
+            self.search_position = (self.search_position + 1) % len(self.search_results)
+            self.jump_to_result()
+
+    def find(self, text: str):
+        self.search_results = self.space_manager.ids.search.query(text)
+        self.search_position = 0
+        if self.search_results:
+            self.jump_to_result()
+
+    def jump_to_result(self):
+        node = self.space_manager.focus(self.search_results[self.search_position])
+        self.selected_objects = [node] if node else []
+        self.selected_edges = []
+        self.profile = None
+
+    @event.rule(pygame.KEYDOWN, pygame.K_s, lambda e: e.mod & pygame.KMOD_CTRL)
     def event_save_to_file(self, _):
+        if self.loading:
+            return
         if self.filepath:
-            file_manager.save(self.space_manager.root_space, self.filepath)
+            file_manager.save(self.space_manager.root_space, self.filepath, self.space_manager.root_view())
+            self.event_manager.watcher.sync()
+            self.base = file_manager.space_to_dict(self.space_manager.root_space)
+        file_manager.save_modules()
 
 
 class SpaceContextMenuEvents:
@@ -237,12 +535,13 @@ class SpaceContextMenuEvents:
                 Const,
                 Operator,
                 If,
+                SubSpace,
                 SelfSpace,
             ])
         }
 
-    def trigger_events(self):
-        self.event.trigger_events(self)
+    def trigger_events(self, events: list, now: int):
+        self.event.trigger_events(self, events, now)
         for rect_params, cls in self.menu_rects.items():
             draw_button(
                 self.window.surface,
@@ -252,16 +551,16 @@ class SpaceContextMenuEvents:
                 colors.menu_text,
             )
 
-    @event.rule(lambda e: e.type == pygame.QUIT)
+    @event.rule(pygame.QUIT)
     def event_game_exit(self, _):
         sys.exit()
 
-    @event.rule(lambda e: e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE)
+    @event.rule(pygame.KEYDOWN, pygame.K_ESCAPE)
     def event_escape(self, _):
         pygame.quit()
         sys.exit()
 
-    @event.rule(lambda e: e.type == pygame.MOUSEBUTTONUP and e.button == 1)
+    @event.rule(pygame.MOUSEBUTTONUP, 1)
     def event_select(self, event):
         selected_cls = None
         for rect_params, cls in self.menu_rects.items():
@@ -271,25 +570,44 @@ class SpaceContextMenuEvents:
         if selected_cls:
             x, y = camera.window_to_world(self.mouse_x, self.mouse_y)
             if selected_cls in [Const, Operator, If]:
-                self.event_manager.switch_to_input(
-                    lambda text: self.space_manager.space.add_node(selected_cls(x, y, text))
-                )
+                self.event_manager.switch_to_input(lambda text: self.add_node(selected_cls(x, y, text)))
+                return
+            elif selected_cls == SubSpace:
+                self.event_manager.switch_to_input(lambda text: self.add_library_node(x, y, text))
                 return
             elif selected_cls == SelfSpace:
-                node = selected_cls(
+                self.add_node(selected_cls(
                     x,
                     y,
                     [(pin.name, pin.title) for pin in self.space_manager.space.input_node.pins],
                     [(pin.name, pin.title) for pin in self.space_manager.space.output_node.pins],
-                )
-                self.space_manager.space.sync_input_pins.add_handlers.append(node.add_input_pin_handler)
-                self.space_manager.space.sync_output_pins.add_handlers.append(node.add_output_pin_handler)
-                self.space_manager.space.add_node(node)
+                ))
             else:
-                self.space_manager.space.add_node(selected_cls(x, y))
+                self.add_node(selected_cls(x, y))
         self.event_manager.switch_to_main()
 
-    @event.rule(lambda e: e.type == pygame.MOUSEBUTTONUP and e.button != 1)
+    def add_node(self, node: Node):
+        history.do(AddNode(self.space_manager.space, node))
+        self.event_manager.preview.node_added(node)
+
+    def add_library_node(self, x: int, y: int, ref: str):
+        workspace = current_workspace()
+        if ref not in workspace and not os.path.isfile(workspace.resolve(ref)):
+            raise ValueError(f'no module {ref!r}')
+        module = workspace.load(ref)
+        if module.error is not None:
+            raise ValueError(f'cannot load {ref!r}: {module.error}')
+        space = module.space
+        self.add_node(SubSpace(
+            x,
+            y,
+            None,
+            [(pin.name, pin.title) for pin in space.input_node.pins],
+            [(pin.name, pin.title) for pin in space.output_node.pins],
+            ref=ref,
+        ))
+
+    @event.rule(pygame.MOUSEBUTTONUP, condition=lambda e: e.button != 1)
     def event_click_escape(self, _):
         self.event_manager.switch_to_main()
 
@@ -317,8 +635,8 @@ class NodeContextMenuEvents:
             for i, value in enumerate(node.get_context_menu_items())
         }
 
-    def trigger_events(self):
-        self.event.trigger_events(self)
+    def trigger_events(self, events: list, now: int):
+        self.event.trigger_events(self, events, now)
         for rect_params, (name, _) in self.menu_rects.items():
             draw_button(
                 self.window.surface,
@@ -334,16 +652,16 @@ class NodeContextMenuEvents:
     def delete_node(self):
         pass
 
-    @event.rule(lambda e: e.type == pygame.QUIT)
+    @event.rule(pygame.QUIT)
     def event_game_exit(self, _):
         sys.exit()
 
-    @event.rule(lambda e: e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE)
+    @event.rule(pygame.KEYDOWN, pygame.K_ESCAPE)
     def event_escape(self, _):
         pygame.quit()
         sys.exit()
 
-    @event.rule(lambda e: e.type == pygame.MOUSEBUTTONUP and e.button == 1)
+    @event.rule(pygame.MOUSEBUTTONUP, 1)
     def event_select(self, event):
         selected_func = None
         for rect_params, (_, func) in self.menu_rects.items():
@@ -352,9 +670,12 @@ class NodeContextMenuEvents:
                 break
         if selected_func:
             selected_func(self.space_manager.space)
+            self.event_manager.preview.reset()
+            self.space_manager.space.edge_index.invalidate()
+            self.space_manager.space.overview.invalidate()
         self.event_manager.switch_to_main()
 
-    @event.rule(lambda e: e.type == pygame.MOUSEBUTTONUP and e.button != 1)
+    @event.rule(pygame.MOUSEBUTTONUP, condition=lambda e: e.button != 1)
     def event_click_escape(self, _):
         self.event_manager.switch_to_main()
 
@@ -370,9 +691,10 @@ class InputEvents:
         self.y = y
         self.callback = callback
         self.text = ''
+        self.error: str | None = None
 
-    def trigger_events(self):
-        self.event.trigger_events(self)
+    def trigger_events(self, events: list, now: int):
+        self.event.trigger_events(self, events, now)
         draw_flexible_button(
             self.window.surface,
             (self.x, self.y),
@@ -380,11 +702,18 @@ class InputEvents:
             colors.menu_bg,
             colors.menu_text,
         )
+        if self.error:
+            draw_flexible_button(self.window.surface, (self.x, self.y + 40), self.error, colors.menu_bg, colors.error_text)
 
-    @event.rule(lambda e: e.type == pygame.KEYDOWN)
+    @event.rule(pygame.KEYDOWN)
     def event_texting(self, event):
         if event.key == pygame.K_RETURN:
-            self.callback(self.text)
+            # a callback refuses the text with ValueError; the prompt stays open to fix it
+            try:
+                self.callback(self.text)
+            except ValueError as e:
+                self.error = str(e)
+                return
             self.event_manager.switch_to_main()
         elif event.key == pygame.K_BACKSPACE:
             self.text = self.text[:-1]
@@ -392,11 +721,3 @@ class InputEvents:
             self.event_manager.switch_to_main()
         else:
             self.text += event.unicode
-
-
-def is_double_click():
-    global _CLICK_TIME
-    current_time = pygame.time.get_ticks()
-    is_double = current_time - _CLICK_TIME < DOUBLE_CLICK_THRESHOLD
-    _CLICK_TIME = current_time
-    return is_double
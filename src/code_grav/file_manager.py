@@ -1,34 +1,247 @@
+import bz2
+import gzip
 import json
+import lzma
 import os
+import zlib
+from functools import partial
+from typing import Iterable, Iterator
 
+from code_grav.diff import SpaceDiff, diff_spaces, edge_key
+from code_grav.ids import IdAllocator, max_id
 from code_grav.nodes import Input, Output, Const, If, Operator, SubSpace, SelfSpace
 from code_grav.pins import BasePin
 from code_grav.space import Space, Edge
 from code_grav.space_manager import SpaceManager
 from code_grav.space_types import Node
-from code_grav.utils import set_last_id, get_pin_by_name
+from code_grav.utils import get_pin_by_name
+from code_grav.workspace import Workspace, BUDGET, current_workspace, use_workspace
+
+
+STREAM_FORMAT = 'codegrav-stream'
+STREAM_VERSION = 1
+# writers by file extension; readers are picked by the magic bytes so renamed files still open
+COMPRESSORS = {
+    '.gz': partial(gzip.open, compresslevel=6),
+    '.xz': partial(lzma.open, preset=3),
+    '.bz2': bz2.open,
+}
+DECOMPRESSORS = {
+    b'\x1f\x8b': gzip.open,
+    b'\xfd7zXZ\x00': lzma.open,
+    b'BZh': bz2.open,
+}
+# what reading a file that is half written or corrupt raises, whichever format it is in
+READ_ERRORS = (OSError, EOFError, ValueError, KeyError, lzma.LZMAError, zlib.error)
+
+
+def get_decompressor(filepath: str):
+    with open(filepath, 'rb') as f:
+        head = f.read(6)
+    for magic, opener in DECOMPRESSORS.items():
+        if head.startswith(magic):
+            return opener
+    return None
 
 
 def load_or_new(filepath: str):
-    sm = SpaceManager(Space([('input1', '1')], [('output1', '1')]))
+    ids = IdAllocator()
     try:
+        space = load_space(filepath, ids)
+    except FileNotFoundError:
+        return SpaceManager(Space([('input1', '1')], [('output1', '1')], ids))
+    return SpaceManager(space)
+
+
+def load_space(filepath: str, ids: IdAllocator) -> Space:
+    opener = get_decompressor(filepath)
+    if opener is None:
         with open(filepath, 'r') as f:
             data = json.load(f)
+        ids.last_id = max_id(data)
+        return dict_to_space(data, ids)
+    with opener(filepath, 'rt') as f:
+        return stream_to_space(f, ids)
+
+
+def load_module(filepath: str) -> tuple[Space, IdAllocator]:
+    ids = IdAllocator()
+    try:
+        return load_space(filepath, ids), ids
     except FileNotFoundError:
-        return sm
-    max_last_id = 0
-    for n in data['nodes']:
-        node = dict_to_node(sm.space, n)
-        max_last_id = max(max_last_id, node.id)
-        sm.space.add_node(node)
-    for e in data['edges']:
-        start, end = dict_to_edge(sm.space, e)
-        sm.space.add_connect(start, end)
-    set_last_id(max_last_id)
-    return sm
-
-
-def dict_to_node(space: Space, data: dict) -> Node:
+        return Space([('input1', '1')], [('output1', '1')], ids), ids
+    except READ_ERRORS as e:
+        raise ValueError(f'{filepath}: {e}') from e
+
+
+def open_workspace(root: str, budget: int = BUDGET) -> Workspace:
+    workspace = Workspace(root, load_module, budget)
+    use_workspace(workspace)
+    return workspace
+
+
+def read(filepath: str) -> dict:
+    opener = get_decompressor(filepath)
+    if opener is None:
+        with open(filepath, 'r') as f:
+            return json.load(f)
+    with opener(filepath, 'rt') as f:
+        return stream_to_dict(f)
+
+
+def read_header(lines: Iterator[str]) -> dict:
+    header = json.loads(next(lines))
+    if header.get('format') != STREAM_FORMAT or header.get('version') != STREAM_VERSION:
+        raise ValueError('CodeGrav: unsupported stream format')
+    return header
+
+
+def stream_to_space(lines: Iterable[str], ids: IdAllocator) -> Space:
+    lines = iter(lines)
+    ids.last_id = max(ids.last_id, read_header(lines)['last_id'])
+    # open spaces with the SubSpace record that each of them belongs to
+    stack: list[tuple[Space, dict | None]] = []
+    owner = None
+    for line in lines:
+        record = json.loads(line)
+        if 'node' in record:
+            space = stack[-1][0]
+            space.add_node(dict_to_node(space, record['node']))
+        elif 'edge' in record:
+            space = stack[-1][0]
+            space.add_connect(*dict_to_edge(space, record['edge']))
+        elif 'subspace' in record:
+            owner = record['subspace']
+        elif 'space' in record:
+            stack.append((new_space(*record['space'], ids), owner))
+            owner = None
+        else:
+            space, data = stack.pop()
+            if not stack:
+                return space
+            parent = stack[-1][0]
+            parent.add_node(dict_to_node(parent, data, space))
+    raise ValueError('CodeGrav: truncated stream')
+
+
+def stream_to_dict(lines: Iterable[str]) -> dict:
+    lines = iter(lines)
+    header = read_header(lines)
+    stack: list[dict] = []
+    owner = None
+    for line in lines:
+        record = json.loads(line)
+        if 'node' in record:
+            stack[-1]['nodes'].append(record['node'])
+        elif 'edge' in record:
+            stack[-1]['edges'].append(record['edge'])
+        elif 'subspace' in record:
+            owner = record['subspace']
+        elif 'space' in record:
+            space = {'nodes': list(record['space']), 'edges': []}
+            if owner is not None:
+                owner['space'] = space
+                stack[-1]['nodes'].append(owner)
+            stack.append(space)
+            owner = None
+        else:
+            space = stack.pop()
+            if not stack:
+                if 'camera' in header:
+                    space['camera'] = header['camera']
+                return space
+    raise ValueError('CodeGrav: truncated stream')
+
+
+def reload(space_manager: SpaceManager, base: dict, data: dict) -> bool:
+    # only what changed on disk since base, the last loaded or saved state, is applied
+    diff = diff_spaces(base, data)
+    if not diff:
+        return False
+    apply_diff(space_manager.root_space, diff)
+    space_manager.prune()
+    return True
+
+
+def apply_diff(space: Space, diff: SpaceDiff):
+    edges = {edge_key(edge_to_dict(edge)): edge for edge in space.edges} if diff.removed_edges else {}
+    gone = [edges[key] for key in diff.removed_edges if key in edges]
+    if gone:
+        space.remove_edges(gone)
+    removed = [space.nodes[node_id] for node_id in diff.removed if node_id in space.nodes]
+    if removed:
+        space.del_nodes(removed)
+    for node_id, data in diff.changed.items():
+        update_node(space.nodes[node_id], data)
+    moved = []
+    for node_id, (x, y) in diff.moved.items():
+        node = space.nodes[node_id]
+        node.x, node.y = x, y
+        moved.append(node)
+    for data in diff.added:
+        space.add_node(dict_to_node(space, data))
+    for node_id, child in diff.spaces.items():
+        apply_diff(space.nodes[node_id].space, child)
+    for start_id, start_pin, end_id, end_pin in diff.added_edges:
+        start = get_pin_by_name(space.nodes[start_id].pins, start_pin)
+        end = get_pin_by_name(space.nodes[end_id].pins, end_pin)
+        space.add_connect(start, end)
+    if moved:
+        space.nodes_moved(moved)
+
+
+def update_pins(pins: list[BasePin], data: list[dict], add_handler, remove_handler):
+    titles = {pin['name']: pin['title'] for pin in data}
+    remove_handler([pin.name for pin in pins if pin.name not in titles])
+    names = {pin.name for pin in pins}
+    add_handler([(name, title) for name, title in titles.items() if name not in names])
+    for pin in pins:
+        pin.title = titles.get(pin.name, pin.title)
+
+
+def update_node(node: Node, data: dict):
+    if isinstance(node, (Input, Output)):
+        update_pins(node.pins, data['pins'], node.pin_events.add_pins, node.pin_events.remove_pins)
+    elif isinstance(node, (SubSpace, SelfSpace)):
+        if isinstance(node, SubSpace):
+            node.ref = data.get('ref')
+        update_pins(node.input_pins, data['input_pins'], node.add_input_pin_handler, node.remove_input_pin_handler)
+        update_pins(node.output_pins, data['output_pins'], node.add_output_pin_handler, node.remove_output_pin_handler)
+    else:
+        node.value = data['value']
+    node.update_search()
+
+
+def dict_to_pins(pins: list[dict]) -> list[tuple[str, str]]:
+    return [(pin['name'], pin['title']) for pin in pins]
+
+
+def dict_to_space(data: dict, ids: IdAllocator) -> Space:
+    boundary = {n['name']: n for n in data['nodes'] if n['name'] in ('Input', 'Output')}
+    space = new_space(
+        boundary.get('Input', {'id': None, 'x': -200, 'y': 0, 'pins': []}),
+        boundary.get('Output', {'id': None, 'x': 200, 'y': 0, 'pins': []}),
+        ids,
+    )
+    space.add_nodes([dict_to_node(space, n) for n in data['nodes'] if n['name'] not in boundary])
+    space.add_edges([Edge(*dict_to_edge(space, e)) for e in data['edges']])
+    return space
+
+
+def new_space(input_data: dict, output_data: dict, ids: IdAllocator) -> Space:
+    space = Space(
+        dict_to_pins(input_data['pins']),
+        dict_to_pins(output_data['pins']),
+        ids,
+        input_data['id'],
+        output_data['id'],
+    )
+    space.input_node.x, space.input_node.y = input_data['x'], input_data['y']
+    space.output_node.x, space.output_node.y = output_data['x'], output_data['y']
+    return space
+
+
+def dict_to_node(space: Space, data: dict, inner: Space | None = None) -> Node:
     if data['name'] == 'Input':
         return Input(
             pin_events=space.sync_input_pins,
@@ -66,32 +279,33 @@ def dict_to_node(space: Space, data: dict) -> Node:
             y=data['y'],
             value=data['value'],
         )
+    elif data['name'] == 'SubSpace' and 'ref' in data:
+        return SubSpace(
+            node_id=data['id'],
+            x=data['x'],
+            y=data['y'],
+            input_pins=[(pin['name'], pin['title']) for pin in data['input_pins']],
+            output_pins=[(pin['name'], pin['title']) for pin in data['output_pins']],
+            space=None,
+            ref=data['ref'],
+        )
     elif data['name'] == 'SubSpace':
-        ss = SubSpace(
+        return SubSpace(
             node_id=data['id'],
             x=data['x'],
             y=data['y'],
             input_pins=[(pin['name'], pin['title']) for pin in data['input_pins']],
             output_pins=[(pin['name'], pin['title']) for pin in data['output_pins']],
-            space=Space(
-                [(pin['name'], pin['title']) for pin in data['input_pins']],
-                [(pin['name'], pin['title']) for pin in data['output_pins']],
-            )
+            space=inner or dict_to_space(data['space'], space.ids),
         )
-        ss.space.sync_input_pins.add_handlers.append(ss.add_input_pin_handler)
-        ss.space.sync_output_pins.add_handlers.append(ss.add_output_pin_handler)
-        return ss
     elif data['name'] == 'SelfSpace':
-        ss = SelfSpace(
+        return SelfSpace(
             node_id=data['id'],
             x=data['x'],
             y=data['y'],
             input_pins=[(pin['name'], pin['title']) for pin in data['input_pins']],
             output_pins=[(pin['name'], pin['title']) for pin in data['output_pins']],
         )
-        space.sync_input_pins.add_handlers.append(ss.add_input_pin_handler)
-        space.sync_output_pins.add_handlers.append(ss.add_output_pin_handler)
-        return ss
     raise NotImplemented()
 
 
@@ -101,13 +315,52 @@ def dict_to_edge(space: Space, data: dict) -> tuple[BasePin, BasePin]:
     return get_pin_by_name(start.pins, data['start']['pin_name']), get_pin_by_name(end.pins, data['end']['pin_name'])
 
 
-def save(root_space: Space, filepath: str):
-    data = space_to_dict(root_space)
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
+def save(root_space: Space, filepath: str, view: tuple[float, float] | None = None):
+    name, extension = os.path.splitext(filepath)
+    compressor = COMPRESSORS.get(extension)
+    if compressor:
+        with compressor(filepath, 'wt') as f:
+            f.writelines(iter_stream(root_space, view))
+        name = os.path.splitext(name)[0]
+    else:
+        data = space_to_dict(root_space)
+        if view:
+            data['camera'] = list(view)
+        with open(filepath, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    with open(name + '.g', 'w') as f:
+        f.writelines(iter_def(root_space))
+
 
-    with open(os.path.splitext(filepath)[0] + '.g', 'w') as f:
-        f.write(space_to_def(root_space))
+def save_modules():
+    for module in current_workspace().pinned():
+        save(module.space, module.path)
+
+
+def iter_stream(root_space: Space, view: tuple[float, float] | None = None) -> Iterator[str]:
+    header = {'format': STREAM_FORMAT, 'version': STREAM_VERSION, 'last_id': root_space.ids.last_id}
+    if view:
+        header['camera'] = list(view)
+    yield json.dumps(header) + '\n'
+    for record in iter_records(root_space):
+        yield json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def iter_records(space: Space) -> Iterator[dict]:
+    # Input and Output open each space so the loader can build it before its nodes arrive
+    yield {'space': [node_to_dict(space.input_node), node_to_dict(space.output_node)]}
+    for node in space.nodes.values():
+        if node is space.input_node or node is space.output_node:
+            continue
+        if isinstance(node, SubSpace) and node.ref is None:
+            yield {'subspace': node_to_dict(node, with_space=False)}
+            yield from iter_records(node.space)
+        else:
+            yield {'node': node_to_dict(node)}
+    for edge in space.edges:
+        yield {'edge': edge_to_dict(edge)}
+    yield {'end': None}
 
 
 def space_to_dict(space):
@@ -123,7 +376,7 @@ def space_to_dict(space):
     }
 
 
-def node_to_dict(node: Node) -> dict:
+def node_to_dict(node: Node, with_space: bool = True) -> dict:
     if isinstance(node, Input):
         return {
             'name': 'Input',
@@ -176,7 +429,7 @@ def node_to_dict(node: Node) -> dict:
             'y': node.y,
             'value': node.value,
         }
-    elif isinstance(node, SubSpace):
+    elif isinstance(node, SubSpace) and node.ref is not None:
         return {
             'name': 'SubSpace',
             'id': node.id,
@@ -196,8 +449,32 @@ def node_to_dict(node: Node) -> dict:
                 }
                 for pin in node.output_pins
             ],
-            'space': space_to_dict(node.space)
+            'ref': node.ref,
+        }
+    elif isinstance(node, SubSpace):
+        data = {
+            'name': 'SubSpace',
+            'id': node.id,
+            'x': node.x,
+            'y': node.y,
+            'input_pins': [
+                {
+                    'name': pin.name,
+                    'title': pin.title,
+                }
+                for pin in node.input_pins
+            ],
+            'output_pins': [
+                {
+                    'name': pin.name,
+                    'title': pin.title,
+                }
+                for pin in node.output_pins
+            ],
         }
+        if with_space:
+            data['space'] = space_to_dict(node.space)
+        return data
     elif isinstance(node, SelfSpace):
         return {
             'name': 'SelfSpace',
@@ -236,12 +513,22 @@ def edge_to_dict(edge: Edge) -> dict:
 
 
 def space_to_def(space: Space) -> str:
-    lines = []
+    return ''.join(iter_def(space))
+
+
+def iter_def(space: Space) -> Iterator[str]:
     for n in space.nodes.values():
-        lines.append(f'node_{n.id} = {node_to_def(n)}\n')
+        if isinstance(n, SubSpace):
+            inner = n.space
+            yield f'node_{n.id} = subspace[\n'
+            # a library module that cannot be loaded is left empty rather than failing the save
+            if inner is not None:
+                yield from iter_def(inner)
+            yield ']\n'
+        else:
+            yield f'node_{n.id} = {node_to_def(n)}\n'
     for e in space.edges:
-        lines.append(edge_to_def(e))
-    return ''.join(lines)
+        yield edge_to_def(e)
 
 
 def node_to_def(node: Node) -> str:
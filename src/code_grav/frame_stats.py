@@ -0,0 +1,117 @@
+import contextlib
+import time
+from collections import defaultdict, deque
+
+import pygame
+from pygame import Surface
+
+from code_grav import colors
+
+_NULL_PHASE = contextlib.nullcontext()
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class _Phase:
+    def __init__(self, stats: 'FrameStats', name: str):
+        self.stats = stats
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *_):
+        self.stats.add(self.name, time.perf_counter() - self.start)
+
+
+class FrameStats:
+    def __init__(self, maxlen: int | None = 600):
+        self.enabled = False
+        self.overlay = False
+        self.reset(maxlen)
+
+    def reset(self, maxlen: int | None = 600):
+        self.maxlen = maxlen
+        self.phases: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=self.maxlen))
+        self.counts: dict[str, int] = {}
+        self._current: dict[str, float] = defaultdict(float)
+        self._frame_start = 0.0
+        self._in_frame = False
+
+    def begin_frame(self):
+        # toggling mid-frame takes effect from the next frame, which has a real start time
+        self._in_frame = self.enabled
+        if self.enabled:
+            self._current.clear()
+            self._frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if not self._in_frame or not self.enabled:
+            return
+        self._current['frame'] = time.perf_counter() - self._frame_start
+        for name, seconds in self._current.items():
+            self.phases[name].append(seconds)
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def add(self, name: str, seconds: float):
+        self._current[name] += seconds
+
+    def count(self, name: str, value: int):
+        self.counts[name] = value
+
+    def percentile(self, name: str, percent: float) -> float:
+        return percentile(sorted(self.phases[name]), percent) * 1000
+
+    def fps(self) -> float:
+        frames = self.phases['frame']
+        total = sum(frames)
+        return len(frames) / total if total else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            'fps': self.fps(),
+            'counts': dict(self.counts),
+            'phases': {
+                name: {
+                    'p50': self.percentile(name, 50),
+                    'p99': self.percentile(name, 99),
+                    'mean': sum(values) / len(values) * 1000 if values else 0.0,
+                }
+                for name, values in self.phases.items()
+            },
+        }
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.enabled = self.overlay
+
+    def draw_overlay(self, surface: Surface):
+        if not self.overlay:
+            return
+        lines = [
+            f'FPS {self.fps():.1f}',
+            f'frame p50 {self.percentile("frame", 50):.2f} ms  p99 {self.percentile("frame", 99):.2f} ms',
+            '  '.join(f'{name} {value}' for name, value in self.counts.items()),
+        ]
+        for name in sorted(self.phases):
+            if name != 'frame':
+                lines.append(f'{name}: p50 {self.percentile(name, 50):.2f} ms  p99 {self.percentile(name, 99):.2f} ms')
+        font = pygame.font.Font(None, 20)
+        y = 10
+        for line in lines:
+            text_surface = font.render(line, True, colors.stats_text, colors.stats_bg)
+            surface.blit(text_surface, (10, y))
+            y += text_surface.get_height() + 2
+
+
+frame_stats = FrameStats()
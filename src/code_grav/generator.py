@@ -0,0 +1,83 @@
+import random
+
+from code_grav.ids import IdAllocator
+from code_grav.nodes import Const, If, Operator, SelfSpace, SubSpace
+from code_grav.pins import InputPin, OutputPin
+from code_grav.space import Space
+from code_grav.space_types import Node
+
+SPACING = 200
+OPERATORS = ['+', '-', '*', '<', '==']
+
+
+def generate_space(
+        nodes: int = 1000,
+        edge_density: float = 1.5,
+        depth: int = 1,
+        subspaces: int = 4,
+        self_spaces: int = 2,
+        pins: int = 2,
+        seed: int = 0,
+        ids: IdAllocator | None = None,
+) -> Space:
+    return _generate(random.Random(seed), nodes, edge_density, depth, subspaces, self_spaces, pins, ids or IdAllocator())
+
+
+def _generate(
+        rnd: random.Random,
+        nodes: int,
+        edge_density: float,
+        depth: int,
+        subspaces: int,
+        self_spaces: int,
+        pins: int,
+        ids: IdAllocator,
+) -> Space:
+    input_pins = [(f'input{i}', str(i)) for i in range(1, pins + 1)]
+    output_pins = [(f'output{i}', str(i)) for i in range(1, pins + 1)]
+    space = Space(input_pins, output_pins, ids)
+    columns = max(1, int(nodes ** 0.5))
+
+    def position(i: int) -> tuple[int, int]:
+        return (i % columns) * SPACING, (i // columns) * SPACING
+
+    created: list[Node] = []
+    for i in range(nodes):
+        x, y = position(i)
+        cls = rnd.choice([Const, Operator, If])
+        if cls is Const:
+            created.append(Const(x, y, str(rnd.randint(0, 99))))
+        elif cls is Operator:
+            created.append(Operator(x, y, rnd.choice(OPERATORS)))
+        else:
+            created.append(If(x, y))
+    if depth > 0:
+        for i in range(subspaces):
+            x, y = position(nodes + i)
+            child = _generate(rnd, max(1, nodes // max(1, subspaces * 4)), edge_density, depth - 1, subspaces, self_spaces, pins, ids)
+            created.append(SubSpace(x, y, child, input_pins, output_pins))
+    for i in range(self_spaces):
+        x, y = position(nodes + subspaces + i)
+        created.append(SelfSpace(x, y, input_pins, output_pins))
+    rnd.shuffle(created)
+    for node in created:
+        space.add_node(node)
+
+    space.input_node.x = -SPACING
+    space.output_node.x = columns * SPACING
+    ordered = [space.input_node] + created + [space.output_node]
+    outputs = [[pin for pin in node.pins if isinstance(pin, OutputPin)] for node in ordered]
+    inputs = [[pin for pin in node.pins if isinstance(pin, InputPin)] for node in ordered]
+    for i, node_outputs in enumerate(outputs[:-1]):
+        for _ in range(_edge_count(rnd, edge_density)):
+            j = rnd.randint(i + 1, len(ordered) - 1)
+            if node_outputs and inputs[j]:
+                space.add_connect(rnd.choice(node_outputs), rnd.choice(inputs[j]))
+    return space
+
+
+def _edge_count(rnd: random.Random, mean: float) -> int:
+    count = int(mean)
+    if rnd.random() < mean - count:
+        count += 1
+    return count
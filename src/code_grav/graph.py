@@ -0,0 +1,182 @@
+from collections import defaultdict, deque
+
+from code_grav.nodes import If
+from code_grav.space_types import BaseEdge, Node, SpaceProtocol
+
+
+def dependency_order(space: SpaceProtocol, node_ids: set[int] | None = None) -> list[Node]:
+    if node_ids is None:
+        node_ids = set(space.nodes)
+    in_degree = {node_id: 0 for node_id in node_ids}
+    dependents = defaultdict(list)
+    for edge in space.edges:
+        start_id, end_id = edge.start.node.id, edge.end.node.id
+        if start_id in node_ids and end_id in node_ids and start_id != end_id:
+            dependents[start_id].append(end_id)
+            in_degree[end_id] += 1
+    queue = deque(node_id for node_id in node_ids if not in_degree[node_id])
+    order = []
+    while queue:
+        node_id = queue.popleft()
+        order.append(node_id)
+        for end_id in dependents[node_id]:
+            in_degree[end_id] -= 1
+            if not in_degree[end_id]:
+                queue.append(end_id)
+    # nodes on a cycle keep their relative order at the tail
+    if len(order) < len(node_ids):
+        ordered = set(order)
+        order.extend(node_id for node_id in space.nodes if node_id in node_ids and node_id not in ordered)
+    return [space.nodes[node_id] for node_id in order]
+
+
+def independent_branches(space: SpaceProtocol) -> list[list[Node]]:
+    # Input and Output are shared by every branch, so they do not join them
+    shared = {space.input_node.id, space.output_node.id}
+    parent = {node_id: node_id for node_id in space.nodes if node_id not in shared}
+
+    def find(node_id: int) -> int:
+        while parent[node_id] != node_id:
+            parent[node_id] = parent[parent[node_id]]
+            node_id = parent[node_id]
+        return node_id
+
+    for edge in space.edges:
+        start_id, end_id = edge.start.node.id, edge.end.node.id
+        if start_id in parent and end_id in parent:
+            parent[find(start_id)] = find(end_id)
+
+    groups: dict[int, list[Node]] = defaultdict(list)
+    for node in space.order.nodes:
+        if node.id in parent:
+            groups[find(node.id)].append(node)
+    return list(groups.values())
+
+
+class DynamicOrder:
+    # Pearce-Kelly dynamic topological order. Edges leaving an If are branches
+    # and do not constrain the order, so the only cycles it can see are the ones
+    # that no If breaks; those edges are kept aside in `cyclic`.
+    def __init__(self):
+        self._slots: list[Node | None] = []
+        self._position: dict[int, int] = {}
+        self._successors: dict[int, dict[int, int]] = defaultdict(dict)
+        self._predecessors: dict[int, dict[int, int]] = defaultdict(dict)
+        self._edge_ends: dict[BaseEdge, tuple[int, int]] = {}
+        self._nodes: list[Node] | None = None
+        self.branches: set[BaseEdge] = set()
+        self.cyclic: set[BaseEdge] = set()
+
+    @property
+    def nodes(self) -> list[Node]:
+        if self._nodes is None:
+            self._nodes = [node for node in self._slots if node is not None]
+            if len(self._nodes) < len(self._slots):
+                self._slots = list(self._nodes)
+                self._position = {node.id: i for i, node in enumerate(self._slots)}
+        return self._nodes
+
+    def position(self, node: Node) -> int:
+        return self._position[node.id]
+
+    def rebuild(self, space: SpaceProtocol):
+        self.__init__()
+        for node in dependency_order(space):
+            self.add_node(node)
+        for edge in space.edges:
+            self.add_edge(edge)
+
+    def add_node(self, node: Node):
+        self._position[node.id] = len(self._slots)
+        self._slots.append(node)
+        self._nodes = None
+
+    def remove_node(self, node: Node):
+        position = self._position.pop(node.id, None)
+        if position is not None:
+            self._slots[position] = None
+            self._nodes = None
+
+    def would_cycle(self, start: Node, end: Node) -> bool:
+        if isinstance(start, If):
+            return False
+        if start is end:
+            return True
+        upper = self._position[start.id]
+        if upper < self._position[end.id]:
+            return False
+        return start.id in self._reach(end.id, upper)
+
+    def add_edge(self, edge: BaseEdge) -> bool:
+        start, end = edge.start.node, edge.end.node
+        self._edge_ends[edge] = start.id, end.id
+        if isinstance(start, If):
+            self.branches.add(edge)
+        elif start is end or not self._link(start.id, end.id):
+            self.cyclic.add(edge)
+            return False
+        return True
+
+    def remove_edge(self, edge: BaseEdge):
+        ends = self._edge_ends.pop(edge, None)
+        if ends is None:
+            return
+        if edge in self.branches:
+            self.branches.discard(edge)
+        elif edge in self.cyclic:
+            self.cyclic.discard(edge)
+        else:
+            self._unlink(*ends)
+            for cyclic_edge in list(self.cyclic):
+                self.cyclic.discard(cyclic_edge)
+                self.add_edge(cyclic_edge)
+
+    def _reach(self, start_id: int, upper: int) -> set[int]:
+        seen = {start_id}
+        stack = [start_id]
+        while stack:
+            for next_id in self._successors[stack.pop()]:
+                if next_id not in seen and self._position.get(next_id, upper + 1) <= upper:
+                    seen.add(next_id)
+                    stack.append(next_id)
+        return seen
+
+    def _reach_back(self, start_id: int, lower: int) -> set[int]:
+        seen = {start_id}
+        stack = [start_id]
+        while stack:
+            for next_id in self._predecessors[stack.pop()]:
+                if next_id not in seen and self._position.get(next_id, lower - 1) >= lower:
+                    seen.add(next_id)
+                    stack.append(next_id)
+        return seen
+
+    def _link(self, start_id: int, end_id: int) -> bool:
+        count = self._successors[start_id].get(end_id, 0)
+        if not count:
+            lower, upper = self._position[end_id], self._position[start_id]
+            if lower < upper:
+                forward = self._reach(end_id, upper)
+                if start_id in forward:
+                    return False
+                backward = self._reach_back(start_id, lower)
+                self._reorder(sorted(backward, key=self._position.get) + sorted(forward, key=self._position.get))
+        self._successors[start_id][end_id] = count + 1
+        self._predecessors[end_id][start_id] = count + 1
+        return True
+
+    def _unlink(self, start_id: int, end_id: int):
+        count = self._successors[start_id].get(end_id, 0) - 1
+        if count > 0:
+            self._successors[start_id][end_id] = count
+            self._predecessors[end_id][start_id] = count
+        else:
+            self._successors[start_id].pop(end_id, None)
+            self._predecessors[end_id].pop(start_id, None)
+
+    def _reorder(self, node_ids: list[int]):
+        nodes = [self._slots[self._position[node_id]] for node_id in node_ids]
+        for node, slot in zip(nodes, sorted(self._position[node_id] for node_id in node_ids)):
+            self._slots[slot] = node
+            self._position[node.id] = slot
+        self._nodes = None
@@ -0,0 +1,296 @@
+import sys
+from collections import deque
+
+from code_grav.space_types import BaseEdge, BasePin, Node, SpaceProtocol
+from code_grav.sync_pins import SyncPins
+
+REF_SIZE = 8
+NODE_SIZE = 512
+EDGE_SIZE = 128
+
+
+class Command:
+    def do(self):
+        self.redo()
+
+    def redo(self):
+        raise NotImplementedError
+
+    def undo(self):
+        raise NotImplementedError
+
+    def size(self) -> int:
+        return sys.getsizeof(self)
+
+
+class AddNode(Command):
+    def __init__(self, space: SpaceProtocol, node: Node):
+        self.space = space
+        self.node = node
+
+    def redo(self):
+        self.space.add_node(self.node)
+
+    def undo(self):
+        self.space.del_nodes([self.node])
+
+    def size(self) -> int:
+        return super().size() + NODE_SIZE
+
+
+class AddNodes(Command):
+    def __init__(self, space: SpaceProtocol, nodes: list[Node], edges: list[BaseEdge]):
+        self.space = space
+        self.nodes = nodes
+        self.edges = edges
+
+    def redo(self):
+        self.space.add_nodes(self.nodes)
+        self.space.add_edges(self.edges)
+
+    def undo(self):
+        self.space.del_nodes(self.nodes)
+
+    def size(self) -> int:
+        return (
+            super().size()
+            + sys.getsizeof(self.nodes) + len(self.nodes) * NODE_SIZE
+            + sys.getsizeof(self.edges) + len(self.edges) * EDGE_SIZE
+        )
+
+
+class DelNodes(Command):
+    def __init__(self, space: SpaceProtocol, nodes: list[Node]):
+        self.space = space
+        self.nodes = nodes
+        self.edges: list[BaseEdge] = []
+
+    def redo(self):
+        self.edges = self.space.del_nodes(self.nodes)
+
+    def undo(self):
+        self.space.add_nodes(self.nodes)
+        self.space.add_edges(self.edges)
+
+    def size(self) -> int:
+        return (
+            super().size()
+            + sys.getsizeof(self.nodes) + len(self.nodes) * NODE_SIZE
+            + sys.getsizeof(self.edges) + len(self.edges) * EDGE_SIZE
+        )
+
+
+class Connect(Command):
+    def __init__(self, space: SpaceProtocol, start: BasePin, end: BasePin):
+        self.space = space
+        self.start = start
+        self.end = end
+        self.edge: BaseEdge | None = None
+
+    def do(self):
+        self.edge = self.space.add_connect(self.start, self.end)
+
+    def redo(self):
+        self.space.add_edges([self.edge])
+
+    def undo(self):
+        self.space.remove_edges([self.edge])
+
+    def size(self) -> int:
+        return super().size() + EDGE_SIZE
+
+
+class DelEdges(Command):
+    def __init__(self, space: SpaceProtocol, edges: list[BaseEdge]):
+        self.space = space
+        self.edges = edges
+
+    def redo(self):
+        self.space.remove_edges(self.edges)
+
+    def undo(self):
+        self.space.add_edges(self.edges)
+
+    def size(self) -> int:
+        return super().size() + sys.getsizeof(self.edges) + len(self.edges) * EDGE_SIZE
+
+
+class MoveNodes(Command):
+    def __init__(self, space: SpaceProtocol, nodes: list[Node], dx: int, dy: int):
+        self.space = space
+        self.nodes = nodes
+        self.dx = dx
+        self.dy = dy
+
+    def do(self):
+        pass
+
+    def redo(self):
+        self._move(self.dx, self.dy)
+
+    def undo(self):
+        self._move(-self.dx, -self.dy)
+
+    def _move(self, dx: int, dy: int):
+        for node in self.nodes:
+            node.x += dx
+            node.y += dy
+        self.space.nodes_moved(self.nodes)
+
+    def size(self) -> int:
+        return super().size() + sys.getsizeof(self.nodes)
+
+
+class SetPositions(Command):
+    def __init__(self, space: SpaceProtocol, nodes: list[Node], old_positions: list[tuple[int, int]]):
+        self.space = space
+        self.nodes = nodes
+        self.old_positions = old_positions
+        self.new_positions = [(node.x, node.y) for node in nodes]
+
+    def do(self):
+        pass
+
+    def redo(self):
+        self._set(self.new_positions)
+
+    def undo(self):
+        self._set(self.old_positions)
+
+    def _set(self, positions: list[tuple[int, int]]):
+        for node, (x, y) in zip(self.nodes, positions):
+            node.x = x
+            node.y = y
+        self.space.nodes_moved(self.nodes)
+
+    def size(self) -> int:
+        return (
+            super().size()
+            + sys.getsizeof(self.nodes)
+            + (sys.getsizeof(self.old_positions) + len(self.old_positions) * sys.getsizeof((0, 0))) * 2
+        )
+
+
+class AddPin(Command):
+    def __init__(self, sync_pins: SyncPins, pin_name: str):
+        self.sync_pins = sync_pins
+        self.pin_name = pin_name
+        self.pins: list[BasePin] = []
+
+    def do(self):
+        pass
+
+    def redo(self):
+        for pin in self.pins:
+            pin.node.restore_pin(pin)
+
+    def undo(self):
+        self.pins = self.sync_pins.remove_pin(self.pin_name)
+
+    def size(self) -> int:
+        return super().size() + sys.getsizeof(self.pins) + len(self.pins) * EDGE_SIZE
+
+
+class NewSubSpace(Command):
+    def __init__(self, space: SpaceProtocol, x: int, y: int, node_ids: list[int]):
+        self.space = space
+        self.x = x
+        self.y = y
+        self.node_ids = node_ids
+        self.sub_space: Node | None = None
+        self.nodes: list[Node] = []
+        self.inner_edges: list[BaseEdge] = []
+        self.old_ends: list[tuple[BaseEdge, BasePin, BasePin]] = []
+        self.new_ends: list[tuple[BaseEdge, BasePin, BasePin]] = []
+
+    def do(self):
+        node_ids = set(self.node_ids)
+        self.nodes = [self.space.nodes[node_id] for node_id in self.node_ids if node_id in self.space.nodes]
+        crossing = []
+        for edge in self.space.edges:
+            start_in, end_in = edge.start.node.id in node_ids, edge.end.node.id in node_ids
+            if start_in and end_in:
+                self.inner_edges.append(edge)
+            elif start_in or end_in:
+                crossing.append(edge)
+        self.old_ends = [(edge, edge.start, edge.end) for edge in crossing]
+        self.sub_space = self.space.new_subspace_from_nodes(self.x, self.y, self.node_ids)
+        self.new_ends = [(edge, edge.start, edge.end) for edge in crossing]
+
+    def redo(self):
+        self.space.del_nodes(self.nodes)
+        self._set_ends(self.new_ends)
+        self.space.add_node(self.sub_space)
+        self.space.add_edges([edge for edge, _, _ in self.new_ends])
+
+    def undo(self):
+        self.space.del_nodes([self.sub_space])
+        self._set_ends(self.old_ends)
+        for node in self.nodes:
+            self.space.add_node(node)
+        self.space.add_edges(self.inner_edges + [edge for edge, _, _ in self.old_ends])
+
+    @staticmethod
+    def _set_ends(ends: list[tuple[BaseEdge, BasePin, BasePin]]):
+        for edge, start, end in ends:
+            edge.start = start
+            edge.end = end
+
+    def size(self) -> int:
+        return (
+            super().size()
+            + NODE_SIZE
+            + sys.getsizeof(self.nodes) + sys.getsizeof(self.node_ids)
+            + sys.getsizeof(self.inner_edges)
+            + (sys.getsizeof(self.old_ends) + len(self.old_ends) * 3 * REF_SIZE) * 2
+        )
+
+
+class History:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._undo: deque[Command] = deque()
+        self._redo: list[Command] = []
+        self._bytes = 0
+
+    def do(self, command: Command) -> Command:
+        command.do()
+        self.push(command)
+        return command
+
+    def push(self, command: Command):
+        for redo_command in self._redo:
+            self._bytes -= redo_command.size()
+        self._redo.clear()
+        self._undo.append(command)
+        self._bytes += command.size()
+        while self._bytes > self.max_bytes and len(self._undo) > 1:
+            self._bytes -= self._undo.popleft().size()
+
+    def undo(self) -> bool:
+        if not self._undo:
+            return False
+        command = self._undo.pop()
+        self._bytes -= command.size()
+        command.undo()
+        self._bytes += command.size()
+        self._redo.append(command)
+        return True
+
+    def redo(self) -> bool:
+        if not self._redo:
+            return False
+        command = self._redo.pop()
+        self._bytes -= command.size()
+        command.redo()
+        self._bytes += command.size()
+        self._undo.append(command)
+        return True
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._bytes = 0
+
+
+history = History()
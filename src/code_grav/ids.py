@@ -0,0 +1,91 @@
+from code_grav.search import SearchIndex
+from code_grav.space_types import Node, SpaceProtocol
+
+
+class IdAllocator:
+    def __init__(self, last_id: int = 0):
+        self.last_id = last_id
+        self._index: dict[int, tuple[SpaceProtocol, Node]] = {}
+        self._owners: dict[SpaceProtocol, tuple[SpaceProtocol, Node]] = {}
+        self.search = SearchIndex()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, node_id: int) -> bool:
+        return node_id in self._index
+
+    def new_id(self) -> int:
+        self.last_id += 1
+        return self.last_id
+
+    def reserve(self, count: int) -> range:
+        start = self.last_id + 1
+        self.last_id += count
+        return range(start, start + count)
+
+    def find(self, node_id: int) -> tuple[SpaceProtocol, Node] | None:
+        return self._index.get(node_id)
+
+    def register(self, space: SpaceProtocol, node: Node):
+        self.register_many(space, [node])
+
+    def register_many(self, space: SpaceProtocol, nodes: list[Node]):
+        new_nodes = []
+        stack = [(space, node) for node in nodes]
+        while stack:
+            space, node = stack.pop()
+            old = self._index.get(node.id)
+            if old is None or old[1] is not node:
+                # the same id may move between spaces, e.g. when a reload lifts a node out of a subspace
+                if old is not None:
+                    self.search.remove(old[1])
+                new_nodes.append(node)
+            self._index[node.id] = space, node
+            if node.id > self.last_id:
+                self.last_id = node.id
+            inner = getattr(node, 'owned_space', None)
+            if inner is not None:
+                self._owners[inner] = space, node
+                # a space registers its nodes as they are added, so nested loads reach each node once;
+                # only a subtree taken out by unregister, e.g. a deleted SubSpace put back, is walked again
+                entry = self._index.get(inner.input_node.id)
+                if entry is None or entry[1] is not inner.input_node:
+                    stack.extend((inner, child) for child in inner.nodes.values())
+        if len(new_nodes) == 1:
+            self.search.add(new_nodes[0])
+        elif new_nodes:
+            self.search.add_many(new_nodes)
+
+    def unregister(self, node: Node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            entry = self._index.get(node.id)
+            if entry is not None and entry[1] is node:
+                del self._index[node.id]
+                self.search.remove(node)
+            inner = getattr(node, 'owned_space', None)
+            if inner is not None:
+                self._owners.pop(inner, None)
+                stack.extend(inner.nodes.values())
+
+    def path(self, space: SpaceProtocol) -> list[Node]:
+        chain = []
+        while space in self._owners:
+            space, node = self._owners[space]
+            chain.append(node)
+        return chain[::-1]
+
+
+def max_id(data: dict) -> int:
+    result = 0
+    stack = [data]
+    while stack:
+        space_data = stack.pop()
+        for node_data in space_data['nodes']:
+            result = max(result, node_data['id'])
+            if 'space' in node_data:
+                stack.append(node_data['space'])
+    return result
+
@@ -0,0 +1,205 @@
+import math
+from collections import defaultdict
+
+from code_grav.graph import dependency_order
+from code_grav.space_types import Node, SpaceProtocol
+
+LAYER_GAP = 200
+NODE_GAP = 30
+SWEEPS = 4
+SWEEP_LIMIT = 50_000
+FORCE_ITERATIONS = 15
+FORCE_DISTANCE = 150
+
+
+def get_edge_pairs(space: SpaceProtocol) -> set[tuple[int, int]]:
+    return {
+        (edge.start.node.id, edge.end.node.id)
+        for edge in space.edges
+        if edge.start.node is not edge.end.node
+    }
+
+
+def assign_layers(space: SpaceProtocol) -> tuple[list[list[int]], list[tuple[int, int]]]:
+    order = [node.id for node in dependency_order(space)]
+    rank = {node_id: i for i, node_id in enumerate(order)}
+    dependencies: dict[int, list[int]] = defaultdict(list)
+    dependents: dict[int, list[int]] = defaultdict(list)
+    backward = []
+    for start, end in get_edge_pairs(space):
+        if rank[start] < rank[end]:
+            dependencies[end].append(start)
+            dependents[start].append(end)
+        else:
+            backward.append((start, end))
+
+    layer = {}
+    for node_id in order:
+        layer[node_id] = max((layer[d] + 1 for d in dependencies[node_id]), default=0)
+    # sources sit right before their first consumer instead of all in the first column
+    for node_id in reversed(order):
+        if not dependencies[node_id] and dependents[node_id] and node_id != space.input_node.id:
+            layer[node_id] = min(layer[d] for d in dependents[node_id]) - 1
+    layer[space.input_node.id] = 0
+    layer[space.output_node.id] = max(
+        (value + 1 for node_id, value in layer.items() if node_id != space.output_node.id),
+        default=1,
+    )
+
+    layers: dict[int, list[int]] = defaultdict(list)
+    for node_id in order:
+        layers[layer[node_id]].append(node_id)
+    return [layers[index] for index in sorted(layers)], backward
+
+
+def order_layers(columns: list[list[int]], dependencies: dict, dependents: dict, sweeps: int = SWEEPS):
+    position = {}
+    for column in columns:
+        for i, node_id in enumerate(column):
+            position[node_id] = i / len(column)
+
+    def sweep(ordered_columns: list[list[int]], neighbours: dict):
+        for column in ordered_columns:
+            barycenter = {}
+            for node_id in column:
+                values = [position[n] for n in neighbours[node_id]]
+                barycenter[node_id] = sum(values) / len(values) if values else position[node_id]
+            column.sort(key=barycenter.__getitem__)
+            for i, node_id in enumerate(column):
+                position[node_id] = i / len(column)
+
+    for i in range(sweeps):
+        if i % 2:
+            sweep(columns[::-1], dependents)
+        else:
+            sweep(columns, dependencies)
+
+
+def layered_layout(space: SpaceProtocol) -> list[tuple[int, int]]:
+    columns, backward = assign_layers(space)
+    if len(space.nodes) <= SWEEP_LIMIT:
+        back = set(backward)
+        dependencies: dict[int, list[int]] = defaultdict(list)
+        dependents: dict[int, list[int]] = defaultdict(list)
+        for start, end in get_edge_pairs(space):
+            if (start, end) not in back:
+                dependencies[end].append(start)
+                dependents[start].append(end)
+        order_layers(columns, dependencies, dependents)
+
+    nodes = space.nodes
+    center_x = sum(node.x for node in nodes.values()) // len(nodes)
+    center_y = sum(node.y for node in nodes.values()) // len(nodes)
+    left = center_x - (len(columns) - 1) * LAYER_GAP // 2
+    for index, column in enumerate(columns):
+        heights = [nodes[node_id].select_rect().height for node_id in column]
+        y = center_y - (sum(heights) + NODE_GAP * (len(column) - 1)) / 2
+        for node_id, height in zip(column, heights):
+            node = nodes[node_id]
+            node.x = left + index * LAYER_GAP
+            node.y = int(y + height / 2)
+            y += height + NODE_GAP
+    return backward
+
+
+def force_layout(space: SpaceProtocol, iterations: int = FORCE_ITERATIONS, distance: int = FORCE_DISTANCE):
+    nodes = list(space.nodes.values())
+    index = {node.id: i for i, node in enumerate(nodes)}
+    pairs = [(index[start], index[end]) for start, end in get_edge_pairs(space)]
+    fixed = {index[space.input_node.id], index[space.output_node.id]}
+    xs = [float(node.x) for node in nodes]
+    ys = [float(node.y) for node in nodes]
+    cell = distance * 2
+    square = distance * distance
+    temperature = float(distance)
+
+    for _ in range(iterations):
+        dx = [0.0] * len(nodes)
+        dy = [0.0] * len(nodes)
+        # repulsion only between nodes in neighbouring grid cells keeps each pass linear
+        grid: dict[tuple[int, int], list[int]] = defaultdict(list)
+        for i in range(len(nodes)):
+            grid[int(xs[i] // cell), int(ys[i] // cell)].append(i)
+        for (cx, cy), members in grid.items():
+            near = [j for ox in (-1, 0, 1) for oy in (-1, 0, 1) for j in grid.get((cx + ox, cy + oy), ())]
+            for i in members:
+                xi, yi = xs[i], ys[i]
+                fx = fy = 0.0
+                for j in near:
+                    if j != i:
+                        ddx, ddy = xi - xs[j], yi - ys[j]
+                        force = square / (ddx * ddx + ddy * ddy or 1.0)
+                        fx += ddx * force
+                        fy += ddy * force
+                dx[i] += fx
+                dy[i] += fy
+        for i, j in pairs:
+            ddx, ddy = xs[j] - xs[i], ys[j] - ys[i]
+            force = math.hypot(ddx, ddy) / distance
+            dx[i] += ddx * force
+            dy[i] += ddy * force
+            dx[j] -= ddx * force
+            dy[j] -= ddy * force
+        for i in range(len(nodes)):
+            length = math.hypot(dx[i], dy[i])
+            if length and i not in fixed:
+                scale = min(length, temperature) / length
+                xs[i] += dx[i] * scale
+                ys[i] += dy[i] * scale
+        temperature *= 0.85
+
+    for node, x, y in zip(nodes, xs, ys):
+        node.x = round(x)
+        node.y = round(y)
+
+
+def auto_layout(space: SpaceProtocol):
+    if layered_layout(space):
+        force_layout(space)
+
+
+def _free_y(columns: dict[int, list[Node]], node: Node, x: int, y: float) -> float:
+    width, height = node.select_rect().size
+    blockers = sorted(
+        (other.y - other.select_rect().height / 2, other.y + other.select_rect().height / 2)
+        for key in range(round(x / LAYER_GAP) - 1, round(x / LAYER_GAP) + 2)
+        for other in columns[key]
+        if abs(other.x - x) * 2 < other.select_rect().width + width
+    )
+    moved = True
+    while moved:
+        moved = False
+        for top, bottom in blockers:
+            if top - NODE_GAP < y + height / 2 and y - height / 2 < bottom + NODE_GAP:
+                y = bottom + NODE_GAP + height / 2
+                moved = True
+    return y
+
+
+def place_nodes(space: SpaceProtocol, nodes: list[Node]):
+    new_ids = {node.id for node in nodes}
+    dependencies: dict[int, list[int]] = defaultdict(list)
+    dependents: dict[int, list[int]] = defaultdict(list)
+    for start, end in get_edge_pairs(space):
+        dependencies[end].append(start)
+        dependents[start].append(end)
+    columns: dict[int, list[Node]] = defaultdict(list)
+    for node in space.nodes.values():
+        if node.id not in new_ids:
+            columns[round(node.x / LAYER_GAP)].append(node)
+
+    placed = set()
+    for node in dependency_order(space, new_ids):
+        upstream = [space.nodes[n] for n in dependencies[node.id] if n not in new_ids or n in placed]
+        downstream = [space.nodes[n] for n in dependents[node.id] if n not in new_ids or n in placed]
+        x = node.x
+        if upstream:
+            x = max(n.x for n in upstream) + LAYER_GAP
+        elif downstream:
+            x = min(n.x for n in downstream) - LAYER_GAP
+        neighbours = upstream + downstream
+        y = sum(n.y for n in neighbours) / len(neighbours) if neighbours else node.y
+        node.x = x
+        node.y = round(_free_y(columns, node, x, y))
+        columns[round(x / LAYER_GAP)].append(node)
+        placed.add(node.id)
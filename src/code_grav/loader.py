@@ -0,0 +1,195 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import BinaryIO, Iterable
+
+import pygame
+from pygame import Surface
+
+from code_grav import colors, file_manager
+from code_grav.camera import camera
+from code_grav.ids import IdAllocator, max_id
+from code_grav.space import Space, Edge
+from code_grav.space_manager import SpaceManager
+from code_grav.space_types import Node
+
+BATCH_SIZE = 256
+# root nodes of a stream are sorted towards the camera this many at a time
+CHUNK_SIZE = 4096
+# batches decoded ahead of the editor; the worker waits when they are not taken
+QUEUE_SIZE = 64
+LOAD_BUDGET = 0.008
+BAR_HEIGHT = 6
+
+
+class ProgressiveLoader:
+    # the worker only parses and orders records; nodes are built on the main
+    # thread between frames, so the space is never changed while it is drawn
+    def __init__(self, filepath: str, budget: float = LOAD_BUDGET):
+        self.filepath = filepath
+        self.budget = budget
+        # an empty stand-in with ids of its own until the worker has read the boundary nodes
+        self.space_manager = SpaceManager(Space([], [], IdAllocator()))
+        self.ids = IdAllocator()
+        self.total = 0
+        self.done = 0
+        self.finished = False
+        self._frame_end = time.perf_counter()
+        self._queue: queue.Queue = queue.Queue(QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    def _work(self):
+        try:
+            opener = file_manager.get_decompressor(self.filepath)
+            if opener is None:
+                # a plain .cg is a single JSON document, so it can only be parsed whole
+                self._publish_dict(file_manager.read(self.filepath))
+            else:
+                with open(self.filepath, 'rb') as raw, opener(raw, 'rt') as f:
+                    self._publish_stream(f, raw)
+        except FileNotFoundError:
+            self._queue.put(('new',))
+        except Exception as e:
+            self._queue.put(('error', e))
+
+    def _publish_dict(self, data: dict):
+        boundary = {n['name']: n for n in data['nodes'] if n['name'] in ('Input', 'Output')}
+        view = data.get('camera')
+        nodes = sorted((n for n in data['nodes'] if n['name'] not in boundary), key=distance_to(view))
+        edges = data['edges']
+        self._queue.put(('space', boundary.get('Input'), boundary.get('Output'), view, max_id(data), len(nodes) + len(edges)))
+        done = 0
+        for kind, records in (('nodes', nodes), ('edges', edges)):
+            for i in range(0, len(records), BATCH_SIZE):
+                batch = records[i:i + BATCH_SIZE]
+                done += len(batch)
+                self._queue.put((kind, batch, done))
+        self._queue.put(('done',))
+
+    def _publish_stream(self, lines: Iterable[str], raw: BinaryIO):
+        # records are handed over as they are decoded: only the nested space being
+        # read and one chunk of root nodes are held, and progress is the compressed offset
+        lines = iter(lines)
+        header = file_manager.read_header(lines)
+        view = header.get('camera')
+        distance = distance_to(view)
+        # open nested spaces with the SubSpace record each of them belongs to; None is the root
+        stack: list[tuple[dict, dict] | None] = []
+        owner = None
+        nodes: list[dict] = []
+        edges: list[dict] = []
+
+        def put_nodes():
+            nodes.sort(key=distance)
+            for i in range(0, len(nodes), BATCH_SIZE):
+                self._queue.put(('nodes', nodes[i:i + BATCH_SIZE], raw.tell()))
+            nodes.clear()
+
+        for line in lines:
+            record = json.loads(line)
+            if 'node' in record:
+                if stack[-1] is not None:
+                    stack[-1][0]['nodes'].append(record['node'])
+                    continue
+                nodes.append(record['node'])
+                if len(nodes) >= CHUNK_SIZE:
+                    put_nodes()
+            elif 'edge' in record:
+                if stack[-1] is not None:
+                    stack[-1][0]['edges'].append(record['edge'])
+                    continue
+                # a space lists all of its nodes before its edges
+                if nodes:
+                    put_nodes()
+                edges.append(record['edge'])
+                if len(edges) >= BATCH_SIZE:
+                    self._queue.put(('edges', edges, raw.tell()))
+                    edges = []
+            elif 'subspace' in record:
+                owner = record['subspace']
+            elif 'space' in record:
+                if not stack:
+                    self._queue.put(('space', *record['space'], view, header['last_id'], os.fstat(raw.fileno()).st_size))
+                    stack.append(None)
+                    continue
+                space = {'nodes': list(record['space']), 'edges': []}
+                owner['space'] = space
+                if stack[-1] is not None:
+                    stack[-1][0]['nodes'].append(owner)
+                stack.append((space, owner))
+                owner = None
+            else:
+                closed = stack.pop()
+                if closed is None:
+                    break
+                if stack[-1] is None:
+                    # a whole SubSpace was read and joins the root nodes
+                    nodes.append(closed[1])
+                    if len(nodes) >= CHUNK_SIZE:
+                        put_nodes()
+        else:
+            raise ValueError('CodeGrav: truncated stream')
+        if nodes:
+            put_nodes()
+        if edges:
+            self._queue.put(('edges', edges, raw.tell()))
+        self._queue.put(('done',))
+
+    def update(self) -> tuple[list[Node], list[Edge]]:
+        nodes, edges = [], []
+        # loading gets at least as much time as the rest of the frame, so a slow
+        # draw of a large graph does not stretch the load over thousands of frames
+        now = time.perf_counter()
+        deadline = now + max(self.budget, now - self._frame_end)
+        while not self.finished and time.perf_counter() < deadline:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            kind = item[0]
+            space = self.space_manager.root_space
+            if kind == 'nodes':
+                batch = [file_manager.dict_to_node(space, data) for data in item[1]]
+                space.add_nodes(batch)
+                nodes.extend(batch)
+                self.done = item[2]
+            elif kind == 'edges':
+                batch = [Edge(*file_manager.dict_to_edge(space, data)) for data in item[1]]
+                space.add_edges(batch)
+                edges.extend(batch)
+                self.done = item[2]
+            elif kind == 'space':
+                _, input_data, output_data, view, last_id, self.total = item
+                self.ids.last_id = max(self.ids.last_id, last_id)
+                self.space_manager.reset(file_manager.new_space(
+                    input_data or {'id': None, 'x': -200, 'y': 0, 'pins': []},
+                    output_data or {'id': None, 'x': 200, 'y': 0, 'pins': []},
+                    self.ids,
+                ))
+                if view:
+                    camera.x, camera.y = view
+            elif kind == 'new':
+                self.space_manager.reset(Space([('input1', '1')], [('output1', '1')], self.ids))
+                self.finished = True
+            elif kind == 'error':
+                raise item[1]
+            else:
+                self.finished = True
+        self._frame_end = time.perf_counter()
+        return nodes, edges
+
+    def draw(self, surface: Surface):
+        if self.finished:
+            return
+        width, height = surface.get_size()
+        progress = min(1, self.done / self.total) if self.total else 0
+        pygame.draw.rect(surface, colors.stats_bg, (0, height - BAR_HEIGHT, width, BAR_HEIGHT))
+        pygame.draw.rect(surface, colors.preview_text, (0, height - BAR_HEIGHT, int(width * progress), BAR_HEIGHT))
+
+
+def distance_to(view: list[float] | None):
+    x, y = view or (0, 0)
+    return lambda data: (data['x'] - x) ** 2 + (data['y'] - y) ** 2
@@ -1,33 +1,112 @@
+import argparse
+import os
 import sys
 
 import pygame
 
-from code_grav import app, file_manager
-from code_grav import colors
+from code_grav import app, file_manager, merge, replay, snapshot
 from code_grav.events import EventManager
+from code_grav.frame_stats import frame_stats
+from code_grav.ids import IdAllocator
+from code_grav.loader import ProgressiveLoader
+from code_grav.profiling import SessionProfiler
+from code_grav.recorder import Recorder
+from code_grav.render import draw_space
 from code_grav.space import Space
 from code_grav.space_manager import SpaceManager
+from code_grav.workspace import BUDGET
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='CodeGrav')
+    parser.add_argument('filepath', nargs='?')
+    parser.add_argument('--record', metavar='FILE', help='record input events of the session to FILE')
+    parser.add_argument('--replay', metavar='FILE', help='replay recorded events headless and report frame times')
+    parser.add_argument('--png', metavar='FILE', help='render the program headless to FILE and exit')
+    parser.add_argument(
+        '--region',
+        metavar=('X', 'Y', 'W', 'H'),
+        type=int,
+        nargs=4,
+        help='world rectangle to render with --png (default: the whole graph)',
+    )
+    parser.add_argument('--tile', type=int, default=4096, help='split --png output into tiles of this size')
+    parser.add_argument(
+        '--profile',
+        metavar='FRAMES',
+        type=int,
+        nargs='?',
+        const=300,
+        help='profile loading and the first FRAMES frames (default 300)',
+    )
+    parser.add_argument(
+        '--workspace',
+        metavar='DIR',
+        help='directory that library SubSpace references are resolved against (default: the file\'s directory, or the current one without a file)',
+    )
+    parser.add_argument(
+        '--library-budget',
+        metavar='MB',
+        type=int,
+        default=BUDGET // (1024 * 1024),
+        help='memory budget for loaded library modules; least recently used ones are evicted beyond it',
+    )
+    return parser.parse_args()
 
 
 def main():
-    if len(sys.argv) == 2:
-        filepath = sys.argv[1]
-    else:
-        filepath = None
+    if sys.argv[1:2] in (['diff'], ['merge']):
+        merge.main(sys.argv[1:])
+    args = parse_args()
+    filepath = args.filepath
+    root = args.workspace or (os.path.dirname(os.path.abspath(filepath)) if filepath else os.getcwd())
+    file_manager.open_workspace(root, args.library_budget * 1024 * 1024)
+
+    if args.replay:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        replay.replay(args.replay, filepath)
+        print(replay.report())
+        return
+
+    if args.png:
+        if not filepath:
+            raise SystemExit('CodeGrav: --png requires a file')
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        app.Window.get()
+        space_manager = file_manager.load_or_new(filepath)
+        region = pygame.Rect(args.region) if args.region else None
+        for path in snapshot.export_png(space_manager.root_space, args.png, region, args.tile):
+            print(path)
+        return
 
     window = app.Window().get()
+    profiler = SessionProfiler(filepath)
+    profile_frames = args.profile
+    if profile_frames is not None:
+        profiler.start()
+    loader = None
     if filepath:
-        space_manager = file_manager.load_or_new(filepath)
+        loader = ProgressiveLoader(filepath)
+        space_manager = loader.space_manager
     else:
-        space_manager = SpaceManager(Space([('input1', '1')], [('output1', '1')]))
-    events = EventManager(space_manager, filepath)
+        space_manager = SpaceManager(Space([('input1', '1')], [('output1', '1')], IdAllocator()))
+    events = EventManager(space_manager, filepath, profiler)
+    events.loader = loader
+    if args.record:
+        events.recorder = Recorder(args.record)
     while True:
-        pygame.transform.smoothscale(window.surface, window.surface.get_size())
-        window.surface.fill(colors.space)
-        for obj in space_manager.space.objects:
-            obj.draw(window.surface)
+        frame_stats.begin_frame()
+        draw_space(window.surface, space_manager.space, frame_stats)
         events.trigger_events()
-        pygame.display.flip()
+        frame_stats.draw_overlay(window.surface)
+        with frame_stats.phase('flip'):
+            pygame.display.flip()
+        frame_stats.end_frame()
+        if profile_frames is not None:
+            profile_frames -= 1
+            if profile_frames <= 0:
+                profiler.stop()
+                profile_frames = None
 
 
 if __name__ == '__main__':
@@ -0,0 +1,253 @@
+import argparse
+import json
+import sys
+from itertools import chain
+
+from code_grav.diff import EdgeKey, SpaceDiff, diff_spaces, edge_key, semantic
+from code_grav.file_manager import read
+
+Path = tuple[int, ...]
+FlatNodes = dict[int, tuple[Path, dict]]
+FlatEdges = dict[tuple[Path, EdgeKey], None]
+
+
+def flatten(data: dict) -> tuple[FlatNodes, FlatEdges]:
+    # ids are unique per file, so every node of every nested space can be keyed by id alone
+    nodes: FlatNodes = {}
+    edges: FlatEdges = {}
+    stack: list[tuple[Path, dict]] = [((), data)]
+    while stack:
+        path, space = stack.pop()
+        for node in space['nodes']:
+            nodes[node['id']] = path, node
+            if 'space' in node:
+                stack.append((path + (node['id'],), node['space']))
+        for edge in space['edges']:
+            edges[path, edge_key(edge)] = None
+    return nodes, edges
+
+
+def renumber(nodes: FlatNodes, edges: FlatEdges, mapping: dict[int, int]) -> tuple[FlatNodes, FlatEdges]:
+    # only entries that mention a renumbered id are rebuilt
+    def path_of(path: Path) -> Path:
+        return tuple(mapping.get(node_id, node_id) for node_id in path)
+
+    new_nodes = {}
+    for node_id, (path, data) in nodes.items():
+        if node_id in mapping or not mapping.keys().isdisjoint(path):
+            node_id = mapping.get(node_id, node_id)
+            path, data = path_of(path), {**data, 'id': node_id}
+        new_nodes[node_id] = path, data
+    new_edges = {}
+    for path, key in edges:
+        start, start_pin, end, end_pin = key
+        if start in mapping or end in mapping or not mapping.keys().isdisjoint(path):
+            path, key = path_of(path), (mapping.get(start, start), start_pin, mapping.get(end, end), end_pin)
+        new_edges[path, key] = None
+    return new_nodes, new_edges
+
+
+def pick(base, ours, theirs) -> tuple[object, bool]:
+    if ours == theirs or theirs == base:
+        return ours, False
+    if ours == base:
+        return theirs, False
+    return ours, True
+
+
+def pin_names(data: dict) -> set[str] | None:
+    if 'pins' in data:
+        return {pin['name'] for pin in data['pins']}
+    if 'input_pins' in data:
+        return {pin['name'] for pin in chain(data['input_pins'], data['output_pins'])}
+    return None
+
+
+def merge3(base: dict, ours: dict, theirs: dict) -> tuple[dict, list[str]]:
+    base_nodes, base_edges = flatten(base)
+    our_nodes, our_edges = flatten(ours)
+    their_nodes, their_edges = flatten(theirs)
+    conflicts = []
+
+    # both sides allocate new ids past the same maximum, so their new nodes may collide
+    last_id = max(chain(base_nodes, our_nodes, their_nodes), default=0)
+    mapping = {}
+    for node_id, (path, data) in their_nodes.items():
+        if node_id in base_nodes or node_id not in our_nodes:
+            continue
+        our_path, our_data = our_nodes[node_id]
+        if our_path != path or semantic(our_data) != semantic(data):
+            last_id += 1
+            mapping[node_id] = last_id
+    if mapping:
+        their_nodes, their_edges = renumber(their_nodes, their_edges, mapping)
+
+    merged: dict[int, tuple[Path, dict, bool]] = {}
+    for node_id in dict.fromkeys(chain(our_nodes, their_nodes)):
+        base_node = base_nodes.get(node_id)
+        our_node = our_nodes.get(node_id)
+        their_node = their_nodes.get(node_id)
+        if our_node is None or their_node is None:
+            path, data = our_node or their_node
+            if base_node is not None:
+                if path == base_node[0] and semantic(data) == semantic(base_node[1]):
+                    continue
+                conflicts.append(f'{describe(data)} was deleted on one side and changed on the other; kept')
+            merged[node_id] = path, dict(data), 'space' in data
+            continue
+        if our_node == their_node:
+            merged[node_id] = our_node[0], dict(our_node[1]), 'space' in our_node[1]
+            continue
+        base_path, base_data = base_node or our_node
+        path, path_conflict = pick(base_path, our_node[0], their_node[0])
+        content, content_conflict = pick(semantic(base_data), semantic(our_node[1]), semantic(their_node[1]))
+        x = pick(base_data['x'], our_node[1]['x'], their_node[1]['x'])[0]
+        y = pick(base_data['y'], our_node[1]['y'], their_node[1]['y'])[0]
+        if path_conflict:
+            conflicts.append(f'{describe(our_node[1])} was moved into different subspaces; kept ours')
+        if content_conflict:
+            conflicts.append(f'{describe(our_node[1])} was changed on both sides; kept ours')
+        owner = our_node[1] if content == semantic(our_node[1]) else their_node[1]
+        merged[node_id] = path, {**content, 'x': x, 'y': y}, 'space' in owner
+
+    spaces: dict[Path, dict] = {(): {'nodes': [], 'edges': []}}
+    for node_id, (path, data, owned) in merged.items():
+        if owned:
+            data['space'] = spaces.setdefault(path + (node_id,), {'nodes': [], 'edges': []})
+    pins: dict[tuple[Path, int], set[str] | None] = {}
+    for node_id, (path, data, _) in merged.items():
+        if path not in spaces:
+            conflicts.append(f'{describe(data)} is inside a deleted subspace; dropped')
+            continue
+        spaces[path]['nodes'].append(data)
+        pins[path, node_id] = pin_names(data)
+
+    for path, key in dict.fromkeys(chain(our_edges, their_edges)):
+        in_ours = (path, key) in our_edges
+        in_theirs = (path, key) in their_edges
+        in_base = (path, key) in base_edges
+        if not (in_ours and in_theirs or not in_base):
+            continue
+        start, start_pin, end, end_pin = key
+        start_pins = pins.get((path, start), set())
+        end_pins = pins.get((path, end), set())
+        if (
+                (path, start) not in pins or (path, end) not in pins
+                or start_pins is not None and start_pin not in start_pins
+                or end_pins is not None and end_pin not in end_pins
+        ):
+            conflicts.append(f'edge {format_edge(key)} lost its node or pin; dropped')
+            continue
+        spaces[path]['edges'].append({
+            'start': {'node_id': start, 'pin_name': start_pin},
+            'end': {'node_id': end, 'pin_name': end_pin},
+        })
+    return spaces[()], conflicts
+
+
+def describe(data: dict) -> str:
+    text = f"{data['name']}#{data['id']}"
+    if 'value' in data:
+        text += f" {data['value']!r}"
+    elif 'ref' in data:
+        text += f" {data['ref']}"
+    return text
+
+
+def format_edge(key: EdgeKey) -> str:
+    start, start_pin, end, end_pin = key
+    return f'{start}.{start_pin} -> {end}.{end_pin}'
+
+
+def describe_change(old: dict, new: dict) -> str:
+    changes = []
+    for key in sorted(set(semantic(old)) | set(semantic(new))):
+        before, after = old.get(key), new.get(key)
+        if before == after:
+            continue
+        if isinstance(before, list) or isinstance(after, list):
+            before = ', '.join(pin['name'] for pin in before or [])
+            after = ', '.join(pin['name'] for pin in after or [])
+            changes.append(f'{key} [{before}] -> [{after}]')
+        else:
+            changes.append(f'{key} {before!r} -> {after!r}')
+    return '; '.join(changes)
+
+
+def label(path: Path) -> str:
+    return '/' + ''.join(f'{node_id}/' for node_id in path)
+
+
+def walk(diff: SpaceDiff, path: Path = ()):
+    yield path, diff
+    for node_id, child in diff.spaces.items():
+        yield from walk(child, path + (node_id,))
+
+
+def report(old: dict, new: dict, diff: SpaceDiff, positions: bool = False) -> tuple[list[str], int]:
+    old_nodes, _ = flatten(old)
+    new_nodes, _ = flatten(new)
+    # the same id in another space is a move, e.g. after grouping nodes into a subspace
+    relocated = {
+        node_id for node_id, (path, _) in old_nodes.items()
+        if node_id in new_nodes and new_nodes[node_id][0] != path
+    }
+    lines = [
+        f'{label(new_nodes[node_id][0])}: > {describe(new_nodes[node_id][1])} moved from {label(old_nodes[node_id][0])}'
+        for node_id in relocated
+    ]
+    moved = 0
+    for path, space_diff in walk(diff):
+        where = label(path)
+        for node_id in space_diff.removed:
+            if node_id not in relocated:
+                lines.append(f'{where}: - {describe(old_nodes[node_id][1])}')
+        for data in space_diff.added:
+            if data['id'] not in relocated:
+                lines.append(f'{where}: + {describe(data)}')
+        for node_id, data in space_diff.changed.items():
+            lines.append(f'{where}: ~ {describe(data)} {describe_change(space_diff.previous[node_id], data)}')
+        for old_id, new_id in space_diff.renamed.items():
+            lines.append(f'{where}: = {describe(old_nodes[old_id][1])} renumbered to {new_id}')
+        for key in space_diff.removed_edges:
+            lines.append(f'{where}: - edge {format_edge(key)}')
+        for key in space_diff.added_edges:
+            lines.append(f'{where}: + edge {format_edge(key)}')
+        moved += len(space_diff.moved)
+    semantic_count = len(lines)
+    if positions:
+        for path, space_diff in walk(diff):
+            for node_id, (x, y) in space_diff.moved.items():
+                lines.append(f'{label(path)}: @ {describe(new_nodes[node_id][1])} -> ({x}, {y})')
+    elif moved:
+        lines.append(f'position-only: {moved} nodes moved')
+    return lines, semantic_count
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog='CodeGrav')
+    commands = parser.add_subparsers(dest='command', required=True)
+    diff_parser = commands.add_parser('diff', help='show semantic and position changes between two .cg files')
+    diff_parser.add_argument('old')
+    diff_parser.add_argument('new')
+    diff_parser.add_argument('--positions', action='store_true', help='list every moved node')
+    merge_parser = commands.add_parser('merge', help='three-way merge of .cg files (usable as a git merge driver)')
+    merge_parser.add_argument('base')
+    merge_parser.add_argument('ours')
+    merge_parser.add_argument('theirs')
+    merge_parser.add_argument('-o', '--out', help='result file (default: overwrite OURS, as git expects)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'diff':
+        old, new = read(args.old), read(args.new)
+        lines, semantic_count = report(old, new, diff_spaces(old, new, rename=True), args.positions)
+        for line in lines:
+            print(line)
+        sys.exit(1 if semantic_count else 0)
+    else:
+        result, conflicts = merge3(read(args.base), read(args.ours), read(args.theirs))
+        with open(args.out or args.ours, 'w') as f:
+            json.dump(result, f, indent=2)
+        for conflict in conflicts:
+            print(f'CodeGrav: {conflict}', file=sys.stderr)
+        sys.exit(1 if conflicts else 0)
@@ -0,0 +1,195 @@
+from collections import defaultdict
+from typing import Iterable
+
+import pygame
+from pygame import Rect, Surface
+
+from code_grav import colors
+from code_grav.app import Window
+from code_grav.camera import camera
+from code_grav.space_types import BaseEdge, Node, SpaceProtocol
+from code_grav.spatial import pin_position, segment_cells
+
+MAP_WIDTH = 240
+MAP_HEIGHT = 160
+MARGIN = 16
+TILE_SIZE = 32
+# room left around the nodes, so that growing the graph rarely rescales the map
+GROWTH = 0.25
+
+Item = Node | BaseEdge
+Tile = tuple[int, int]
+
+
+class Overview:
+    # a downsampled picture of one space; a change redraws only the tiles it
+    # touches, and anything that leaves the mapped area rescales on the next draw
+    def __init__(self, width: int = MAP_WIDTH, height: int = MAP_HEIGHT, tile_size: int = TILE_SIZE):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        # built lazily on the first draw, so bulk loads and unvisited subspaces never pay for it
+        self.dirty = True
+        self.surface: Surface | None = None
+        self.scale = 1.0
+        self.left = 0.0
+        self.top = 0.0
+        self.rebuilds = 0
+        self._tiles: dict[Tile, dict[Item, None]] = defaultdict(dict)
+        self._items: dict[Item, tuple[bool, tuple, list[Tile]]] = {}
+        self._dirty_tiles: set[Tile] = set()
+
+    def invalidate(self):
+        self.dirty = True
+
+    def to_map(self, x: float, y: float) -> tuple[float, float]:
+        return (x - self.left) * self.scale, (y - self.top) * self.scale
+
+    def to_world(self, x: float, y: float) -> tuple[float, float]:
+        return self.left + x / self.scale, self.top + y / self.scale
+
+    def rebuild(self, space: SpaceProtocol):
+        self.dirty = False
+        self.rebuilds += 1
+        self._tiles = defaultdict(dict)
+        self._items = {}
+        nodes = list(space.nodes.values())
+        rects = [node.world_rect() for node in nodes]
+        left = min(x for x, _, _, _ in rects)
+        top = min(y for _, y, _, _ in rects)
+        right = max(x + w for x, _, w, _ in rects)
+        bottom = max(y + h for _, y, _, h in rects)
+        extent = max((right - left) / self.width, (bottom - top) / self.height, 1.0) * (1 + 2 * GROWTH)
+        self.scale = 1 / extent
+        self.left = (left + right) / 2 - self.width / 2 * extent
+        self.top = (top + bottom) / 2 - self.height / 2 * extent
+        if self.surface is None:
+            self.surface = Surface((self.width, self.height))
+        for node, rect in zip(nodes, rects):
+            self._add(node, True, self._node_shape(rect))
+        self.update(edges=space.edges)
+        self._redraw()
+
+    def _node_shape(self, rect: tuple[float, float, int, int]) -> tuple[list[Tile], tuple] | None:
+        x, y, width, height = rect
+        x, y = self.to_map(x, y)
+        if x < 0 or y < 0:
+            return None
+        x, y = int(x), int(y)
+        width, height = max(2, round(width * self.scale)), max(2, round(height * self.scale))
+        if x + width > self.width or y + height > self.height:
+            return None
+        size = self.tile_size
+        left, top, right, bottom = x // size, y // size, (x + width - 1) // size, (y + height - 1) // size
+        if left == right and top == bottom:
+            return [(left, top)], (x, y, width, height)
+        tiles = [(tx, ty) for tx in range(left, right + 1) for ty in range(top, bottom + 1)]
+        return tiles, (x, y, width, height)
+
+    def _edge_shape(self, edge: BaseEdge) -> tuple[list[Tile], tuple] | None:
+        x1, y1 = self.to_map(*pin_position(edge.start))
+        x2, y2 = self.to_map(*pin_position(edge.end))
+        if not (0 <= min(x1, x2) and max(x1, x2) < self.width and 0 <= min(y1, y2) and max(y1, y2) < self.height):
+            return None
+        return segment_cells(x1, y1, x2, y2, self.tile_size), ((x1, y1), (x2, y2))
+
+    def _add(self, item: Item, is_node: bool, shape: tuple[list[Tile], tuple] | None):
+        self.remove(item)
+        if shape is None:
+            self.dirty = True
+            return
+        tiles, shape = shape
+        self._items[item] = is_node, shape, tiles
+        for tile in tiles:
+            self._tiles[tile][item] = None
+        self._dirty_tiles.update(tiles)
+
+    def update(self, nodes: Iterable[Node] = (), edges: Iterable[BaseEdge] = ()):
+        for node in nodes:
+            if self.dirty:
+                return
+            self._add(node, True, self._node_shape(node.world_rect()))
+        for edge in edges:
+            if self.dirty:
+                return
+            self._add(edge, False, self._edge_shape(edge))
+
+    def remove(self, item: Item):
+        entry = self._items.pop(item, None)
+        if entry is None:
+            return
+        tiles = entry[2]
+        for tile in tiles:
+            items = self._tiles[tile]
+            del items[item]
+            if not items:
+                del self._tiles[tile]
+        self._dirty_tiles.update(tiles)
+
+    def refresh(self, space: SpaceProtocol) -> Surface:
+        if self.dirty:
+            self.rebuild(space)
+        elif len(self._dirty_tiles) * 2 > self._tile_count():
+            self._redraw()
+        elif self._dirty_tiles:
+            size = self.tile_size
+            for tx, ty in self._dirty_tiles:
+                rect = Rect(tx * size, ty * size, size, size)
+                self.surface.set_clip(rect)
+                self._draw(rect, self._tiles.get((tx, ty), {}))
+            self.surface.set_clip(None)
+            self._dirty_tiles = set()
+        return self.surface
+
+    def _tile_count(self) -> int:
+        return -(-self.width // self.tile_size) * -(-self.height // self.tile_size)
+
+    def _redraw(self):
+        self._draw(self.surface.get_rect(), self._items)
+        self._dirty_tiles = set()
+
+    def _draw(self, rect: Rect, items: Iterable[Item]):
+        self.surface.fill(colors.minimap_bg, rect)
+        entries = [self._items[item] for item in items]
+        # edges first, so nodes stay on top as in the editor
+        for is_node, shape, _ in entries:
+            if not is_node:
+                pygame.draw.line(self.surface, colors.minimap_edge, *shape)
+        for is_node, shape, _ in entries:
+            if is_node:
+                pygame.draw.rect(self.surface, colors.minimap_node, shape)
+
+
+class Minimap:
+    def __init__(self):
+        self.visible = True
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def rect(self) -> Rect:
+        window = Window.get()
+        return Rect(window.width - MAP_WIDTH - MARGIN, window.height - MAP_HEIGHT - MARGIN, MAP_WIDTH, MAP_HEIGHT)
+
+    def hit(self, pos: tuple[int, int]) -> bool:
+        return self.visible and self.rect().collidepoint(pos)
+
+    def jump(self, space: SpaceProtocol, pos: tuple[int, int]):
+        rect = self.rect()
+        camera.x, camera.y = space.overview.to_world(pos[0] - rect.x, pos[1] - rect.y)
+
+    def draw(self, surface: Surface, space: SpaceProtocol):
+        if not self.visible:
+            return
+        overview = space.overview
+        rect = self.rect()
+        surface.blit(overview.refresh(space), rect)
+        left, top = overview.to_map(camera.x - camera.half_w, camera.y - camera.half_h)
+        right, bottom = overview.to_map(camera.x + camera.half_w, camera.y + camera.half_h)
+        view = Rect(rect.x + left, rect.y + top, max(2, right - left), max(2, bottom - top)).clip(rect)
+        if view.width and view.height:
+            pygame.draw.rect(surface, colors.minimap_view, view, 1)
+        pygame.draw.rect(surface, colors.minimap_view, rect, 1)
+
+
+minimap = Minimap()
@@ -1,15 +1,16 @@
+import os
 from typing import Sequence
 
-import pygame
-from pygame import Surface, Rect
+from pygame import Surface
 
 from code_grav import colors
-from code_grav.camera import camera
+from code_grav.history import history, AddPin, DelNodes
 from code_grav.sync_pins import SyncPins
 from code_grav.pins import OutputPin, InputPin
 from code_grav.render import draw_button, draw_circle, draw_text_top_button
 from code_grav.space_types import Node, ContextMenuItems, SpaceProtocol, BasePin, BaseNamedPin
-from code_grav.utils import get_new_id, get_max_pin_id, generate_pos_pins
+from code_grav.utils import get_max_pin_id, generate_pos_pins
+from code_grav.workspace import current_workspace
 
 
 class Input(Node):
@@ -17,16 +18,15 @@ class Input(Node):
     width = half_width * 2
 
     def __init__(self, pin_events: SyncPins, x: int, y: int, pins: list[tuple[str, str]], node_id: int | None = None):
-        self.id = node_id or get_new_id()
+        self.id = node_id
         self.x = x
         self.y = y
         self.pin_events = pin_events
-        self.pin_events.add_handlers.append(self.add_pin_handler)
-        self._pins = [
-            OutputPin(self, name, title, self.half_width, 0)
-            for name, title in pins
-        ]
-        self.height = generate_pos_pins(self.pins, 100 - 15, 15)
+        self.pin_events.subscribe(self.add_pin_handler, self.remove_pin_handler)
+        self._pins = []
+        self._pin_names = set()
+        self.height = 100
+        self._new_pins(pins)
         self.half_height = self.height // 2
 
     @property
@@ -38,9 +38,8 @@ class Input(Node):
         for pin in self.pins:
             pin.draw(surface)
 
-    def select_rect(self) -> Rect:
-        x, y = camera.world_to_window(self.x - self.half_width, self.y - self.half_height)
-        return pygame.Rect(x, y, self.width, self.height)
+    def world_rect(self) -> tuple[float, float, int, int]:
+        return self.x - self.half_width, self.y - self.half_height, self.width, self.height
 
     def get_context_menu_items(self) -> ContextMenuItems:
         return [
@@ -48,23 +47,48 @@ class Input(Node):
         ]
 
     def _new_pin(self, pin_name: str, pin_title: str) -> BaseNamedPin | None:
-        for pin in self.pins:
-            if pin.name == pin_name:
-                return
-        pin = OutputPin(self, pin_name, pin_title, self.half_width, 0)
-        self._pins.append(pin)
-        self.height = generate_pos_pins(self.pins, self.height - 15, 15)
-        self.half_height = self.height // 2
-        return pin
+        pins = self._new_pins([(pin_name, pin_title)])
+        return pins[0] if pins else None
+
+    def _new_pins(self, pins: list[tuple[str, str]]) -> list[BaseNamedPin]:
+        new_pins = []
+        for pin_name, pin_title in pins:
+            if pin_name not in self._pin_names:
+                self._pin_names.add(pin_name)
+                new_pins.append(OutputPin(self, pin_name, pin_title, self.half_width, 0))
+        if new_pins:
+            self._pins.extend(new_pins)
+            self.height = generate_pos_pins(self.pins, self.height - 15, 15)
+            self.half_height = self.height // 2
+        return new_pins
 
     def on_new_pin(self, _: SpaceProtocol):
         max_int = str(get_max_pin_id(self._pins, 'input') + 1)
         pin = self._new_pin('input' + max_int, max_int)
         if pin:
             self.pin_events.add_pin(pin.name, pin.title)
-
-    def add_pin_handler(self, pin_name: str, pin_title: str):
-        self._new_pin(pin_name, pin_title)
+            history.push(AddPin(self.pin_events, pin.name))
+
+    def add_pin_handler(self, pins: list[tuple[str, str]]):
+        self._new_pins(pins)
+        self.update_search()
+
+    def remove_pin_handler(self, pin_names: list[str]) -> list[BasePin]:
+        removed = [pin for pin in self._pins if pin.name in pin_names]
+        if removed:
+            self._pins = [pin for pin in self._pins if pin.name not in pin_names]
+            self._pin_names.difference_update(pin_names)
+            self.height = generate_pos_pins(self.pins, 100 - 15, 15)
+            self.half_height = self.height // 2
+        self.update_search()
+        return removed
+
+    def restore_pin(self, pin: BasePin):
+        self._pins.append(pin)
+        self._pin_names.add(pin.name)
+        self.height = generate_pos_pins(self.pins, self.height - 15, 15)
+        self.half_height = self.height // 2
+        self.update_search()
 
 
 class Output(Node):
@@ -72,16 +96,15 @@ class Output(Node):
     width = half_width * 2
 
     def __init__(self, pin_events: SyncPins, x: int, y: int, pins: list[tuple[str, str]], node_id: int | None = None):
-        self.id = node_id or get_new_id()
+        self.id = node_id
         self.x = x
         self.y = y
         self.pin_events = pin_events
-        self.pin_events.add_handlers.append(self.add_pin_handler)
-        self._pins = [
-            InputPin(self, name, title, -self.half_width, 0)
-            for name, title in pins
-        ]
-        self.height = generate_pos_pins(self.pins, 100 - 15, 15)
+        self.pin_events.subscribe(self.add_pin_handler, self.remove_pin_handler)
+        self._pins = []
+        self._pin_names = set()
+        self.height = 100
+        self._new_pins(pins)
         self.half_height = self.height // 2
 
     @property
@@ -93,9 +116,8 @@ class Output(Node):
         for pin in self.pins:
             pin.draw(surface)
 
-    def select_rect(self) -> Rect:
-        x, y = camera.world_to_window(self.x - self.half_width, self.y - self.half_height)
-        return pygame.Rect(x, y, self.width, self.height)
+    def world_rect(self) -> tuple[float, float, int, int]:
+        return self.x - self.half_width, self.y - self.half_height, self.width, self.height
 
     def get_context_menu_items(self) -> ContextMenuItems:
         return [
@@ -103,23 +125,48 @@ class Output(Node):
         ]
 
     def _new_pin(self, pin_name: str, pin_title: str) -> BaseNamedPin | None:
-        for pin in self.pins:
-            if pin.name == pin_name:
-                return
-        pin = InputPin(self, pin_name, pin_title, -self.half_width, 0)
-        self._pins.append(pin)
-        self.height = generate_pos_pins(self.pins, self.height - 15, 15)
-        self.half_height = self.height // 2
-        return pin
+        pins = self._new_pins([(pin_name, pin_title)])
+        return pins[0] if pins else None
+
+    def _new_pins(self, pins: list[tuple[str, str]]) -> list[BaseNamedPin]:
+        new_pins = []
+        for pin_name, pin_title in pins:
+            if pin_name not in self._pin_names:
+                self._pin_names.add(pin_name)
+                new_pins.append(InputPin(self, pin_name, pin_title, -self.half_width, 0))
+        if new_pins:
+            self._pins.extend(new_pins)
+            self.height = generate_pos_pins(self.pins, self.height - 15, 15)
+            self.half_height = self.height // 2
+        return new_pins
 
     def on_new_pin(self, _: SpaceProtocol):
         max_int = str(get_max_pin_id(self._pins, 'output') + 1)
         pin = self._new_pin('output' + max_int, max_int)
         if pin:
             self.pin_events.add_pin(pin.name, pin.title)
-
-    def add_pin_handler(self, pin_name: str, pin_title: str):
-        self._new_pin(pin_name, pin_title)
+            history.push(AddPin(self.pin_events, pin.name))
+
+    def add_pin_handler(self, pins: list[tuple[str, str]]):
+        self._new_pins(pins)
+        self.update_search()
+
+    def remove_pin_handler(self, pin_names: list[str]) -> list[BasePin]:
+        removed = [pin for pin in self._pins if pin.name in pin_names]
+        if removed:
+            self._pins = [pin for pin in self._pins if pin.name not in pin_names]
+            self._pin_names.difference_update(pin_names)
+            self.height = generate_pos_pins(self.pins, 100 - 15, 15)
+            self.half_height = self.height // 2
+        self.update_search()
+        return removed
+
+    def restore_pin(self, pin: BasePin):
+        self._pins.append(pin)
+        self._pin_names.add(pin.name)
+        self.height = generate_pos_pins(self.pins, self.height - 15, 15)
+        self.half_height = self.height // 2
+        self.update_search()
 
 
 class Const(Node):
@@ -127,7 +174,7 @@ class Const(Node):
     size = half_size * 2
 
     def __init__(self, x: int, y: int, value: str = '1', node_id: int | None = None):
-        self.id = node_id or get_new_id()
+        self.id = node_id
         self.x = x
         self.y = y
         self.value = value
@@ -141,18 +188,17 @@ class Const(Node):
         return self._pins
 
     def draw(self, surface: Surface):
-        x, y = camera.world_to_window(self.x, self.y)
+        x, y = self.select_rect().center
         draw_circle(surface, x, y, self.value, self.half_size)
         for pin in self.pins:
             pin.draw(surface)
 
-    def select_rect(self) -> Rect:
-        x, y = camera.world_to_window(self.x - self.half_size, self.y - self.half_size)
-        return pygame.Rect(x, y, self.size, self.size)
+    def world_rect(self) -> tuple[float, float, int, int]:
+        return self.x - self.half_size, self.y - self.half_size, self.size, self.size
 
     def get_context_menu_items(self) -> ContextMenuItems:
         return [
-            ("delete node", lambda space: space.del_node(self)),
+            ("delete node", lambda space: history.do(DelNodes(space, [self]))),
         ]
 
 
@@ -163,7 +209,7 @@ class If(Node):
     height = half_height * 2
 
     def __init__(self, x: int, y: int, value: str = 'IF', node_id: int | None = None):
-        self.id = node_id or get_new_id()
+        self.id = node_id
         self.x = x
         self.y = y
         self.value = value
@@ -183,13 +229,12 @@ class If(Node):
         for pin in self.pins:
             pin.draw(surface)
 
-    def select_rect(self) -> Rect:
-        x, y = camera.world_to_window(self.x - self.half_width, self.y - self.half_height)
-        return pygame.Rect(x, y, self.width, self.height)
+    def world_rect(self) -> tuple[float, float, int, int]:
+        return self.x - self.half_width, self.y - self.half_height, self.width, self.height
 
     def get_context_menu_items(self) -> ContextMenuItems:
         return [
-            ("delete node", lambda space: space.del_node(self)),
+            ("delete node", lambda space: history.do(DelNodes(space, [self]))),
         ]
 
 
@@ -200,7 +245,7 @@ class Operator(Node):
     height = half_height * 2
 
     def __init__(self, x: int, y: int, value: str = '+', node_id: int | None = None):
-        self.id = node_id or get_new_id()
+        self.id = node_id
         self.x = x
         self.y = y
         self.value = value
@@ -219,13 +264,12 @@ class Operator(Node):
         for pin in self.pins:
             pin.draw(surface)
 
-    def select_rect(self) -> Rect:
-        x, y = camera.world_to_window(self.x - self.half_width, self.y - self.half_height)
-        return pygame.Rect(x, y, self.width, self.height)
+    def world_rect(self) -> tuple[float, float, int, int]:
+        return self.x - self.half_width, self.y - self.half_height, self.width, self.height
 
     def get_context_menu_items(self) -> ContextMenuItems:
         return [
-            ("delete node", lambda space: space.del_node(self)),
+            ("delete node", lambda space: history.do(DelNodes(space, [self]))),
         ]
 
 
@@ -239,36 +283,57 @@ class SubSpace(Node):
             self,
             x: int,
             y: int,
-            space: SpaceProtocol,
+            space: SpaceProtocol | None,
             input_pins: list[tuple[str, str]],
             output_pins: list[tuple[str, str]],
             node_id: int | None = None,
+            ref: str | None = None,
     ):
-        self.id = node_id or get_new_id()
+        self.id = node_id
         self.x = x
         self.y = y
-        self.space = space
+        # a library reference keeps no space of its own: the workspace loads and evicts it
+        self.ref = ref
+        self.owned_space = space if ref is None else None
         self.input_pins = []
         self.output_pins = []
-        for name, title in input_pins:
-            self._new_input_pin(name, title)
-        for name, title in output_pins:
-            self._new_output_pin(name, title)
-        self.height = max(
-            generate_pos_pins(self.input_pins, 100 - 15, 15),
-            generate_pos_pins(self.output_pins, 100 - 15, 15),
-        )
-        self.half_height = self.height // 2
+        self._input_names = set()
+        self._output_names = set()
+        self._add_pins(self.input_pins, self._input_names, InputPin, -self.half_width, input_pins)
+        self._add_pins(self.output_pins, self._output_names, OutputPin, self.half_width, output_pins)
+        self._layout_pins()
 
     @property
     def pins(self) -> Sequence[BasePin]:
         return self.input_pins + self.output_pins
 
+    @property
+    def space(self) -> SpaceProtocol | None:
+        # None for a library module that cannot be loaded
+        if self.ref is None:
+            return self.owned_space
+        return current_workspace().load(self.ref).space
+
+    def attach(self, _: SpaceProtocol):
+        if self.ref is None:
+            self.space.sync_input_pins.subscribe(self.add_input_pin_handler, self.remove_input_pin_handler)
+            self.space.sync_output_pins.subscribe(self.add_output_pin_handler, self.remove_output_pin_handler)
+        else:
+            # registered without loading; the workspace forwards pin edits once the module is opened
+            current_workspace().reference(self)
+
+    def detach(self, _: SpaceProtocol):
+        if self.ref is None:
+            self.space.sync_input_pins.unsubscribe(self)
+            self.space.sync_output_pins.unsubscribe(self)
+        else:
+            current_workspace().unreference(self)
+
     def draw(self, surface: Surface):
         draw_text_top_button(
             surface,
             self.select_rect(),
-            'SubSpace',
+            'SubSpace' if self.ref is None else os.path.splitext(os.path.basename(self.ref))[0],
             colors.space,
             colors.node_text,
             colors.node_border,
@@ -276,58 +341,111 @@ class SubSpace(Node):
         for pin in self.pins:
             pin.draw(surface)
 
-    def select_rect(self) -> Rect:
-        x, y = camera.world_to_window(self.x - self.half_width, self.y - self.half_height)
-        return pygame.Rect(x, y, self.width, self.height)
+    def world_rect(self) -> tuple[float, float, int, int]:
+        return self.x - self.half_width, self.y - self.half_height, self.width, self.height
 
     def generate_pos_pins(self, prefix: str):
         pins = [pin for pin in self.pins if pin.name.startswith(prefix)]
         generate_pos_pins(pins, self.height, 0)
 
     def get_context_menu_items(self) -> ContextMenuItems:
+        delete = ("delete node", lambda space: history.do(DelNodes(space, [self])))
+        if self.ref is not None:
+            # the interface of a library module is edited inside the module
+            return [delete]
         return [
             ("new input pin", self.on_new_input_pin),
             ("new output pin", self.on_new_output_pin),
-            ("delete node", lambda space: space.del_node(self)),
+            delete,
         ]
 
     def _new_input_pin(self, pin_name: str, pin_title: str) -> BasePin | None:
-        for pin in self.input_pins:
-            if pin.name == pin_name:
-                return
-        pin = InputPin(self, pin_name, pin_title, -self.half_width, 0)
-        self.input_pins.append(pin)
-        self.height = generate_pos_pins(self.input_pins, self.height - 15, 15)
-        self.half_height = self.height // 2
-        return pin
+        pins = self._new_input_pins([(pin_name, pin_title)])
+        return pins[0] if pins else None
+
+    def _new_input_pins(self, pins: list[tuple[str, str]]) -> list[BasePin]:
+        new_pins = self._add_pins(self.input_pins, self._input_names, InputPin, -self.half_width, pins)
+        if new_pins:
+            self.height = generate_pos_pins(self.input_pins, self.height - 15, 15)
+            self.half_height = self.height // 2
+        return new_pins
 
     def on_new_input_pin(self, _: SpaceProtocol):
         max_int = str(get_max_pin_id(self.input_pins, 'input') + 1)
         pin = self._new_input_pin('input' + max_int, max_int)
         if pin:
             self.space.sync_input_pins.add_pin(pin.name, max_int)
+            history.push(AddPin(self.space.sync_input_pins, pin.name))
+
+    def add_input_pin_handler(self, pins: list[tuple[str, str]]):
+        self._new_input_pins(pins)
+        self.update_search()
 
-    def add_input_pin_handler(self, pin_name: str, pin_title: str):
-        self._new_input_pin(pin_name, pin_title)
+    def remove_input_pin_handler(self, pin_names: list[str]) -> list[BasePin]:
+        removed = [pin for pin in self.input_pins if pin.name in pin_names]
+        if removed:
+            self.input_pins = [pin for pin in self.input_pins if pin.name not in pin_names]
+            self._input_names.difference_update(pin_names)
+            self._layout_pins()
+        self.update_search()
+        return removed
 
     def _new_output_pin(self, pin_name: str, pin_title: str) -> BasePin | None:
-        for pin in self.output_pins:
-            if pin.name == pin_name:
-                return
-        pin = OutputPin(self, pin_name, pin_title, self.half_width, 0)
-        self.output_pins.append(pin)
-        self.height = generate_pos_pins(self.output_pins, self.height - 15, 15)
-        self.half_height = self.height // 2
-        return pin
+        pins = self._new_output_pins([(pin_name, pin_title)])
+        return pins[0] if pins else None
+
+    def _new_output_pins(self, pins: list[tuple[str, str]]) -> list[BasePin]:
+        new_pins = self._add_pins(self.output_pins, self._output_names, OutputPin, self.half_width, pins)
+        if new_pins:
+            self.height = generate_pos_pins(self.output_pins, self.height - 15, 15)
+            self.half_height = self.height // 2
+        return new_pins
 
     def on_new_output_pin(self, _: SpaceProtocol):
         max_int = str(get_max_pin_id(self.output_pins, 'output') + 1)
         pin = self._new_output_pin('output' + max_int, max_int)
         if pin:
             self.space.sync_output_pins.add_pin(pin.name, max_int)
-
-    def add_output_pin_handler(self, pin_name: str, pin_title: str):
-        self._new_output_pin(pin_name, pin_title)
+            history.push(AddPin(self.space.sync_output_pins, pin.name))
+
+    def add_output_pin_handler(self, pins: list[tuple[str, str]]):
+        self._new_output_pins(pins)
+        self.update_search()
+
+    def remove_output_pin_handler(self, pin_names: list[str]) -> list[BasePin]:
+        removed = [pin for pin in self.output_pins if pin.name in pin_names]
+        if removed:
+            self.output_pins = [pin for pin in self.output_pins if pin.name not in pin_names]
+            self._output_names.difference_update(pin_names)
+            self._layout_pins()
+        self.update_search()
+        return removed
+
+    def restore_pin(self, pin: BasePin):
+        if isinstance(pin, InputPin):
+            self.input_pins.append(pin)
+            self._input_names.add(pin.name)
+        else:
+            self.output_pins.append(pin)
+            self._output_names.add(pin.name)
+        self._layout_pins()
+        self.update_search()
+
+    def _add_pins(self, side_pins: list, names: set[str], pin_cls, x: int, pins: list[tuple[str, str]]) -> list:
+        new_pins = []
+        for pin_name, pin_title in pins:
+            if pin_name not in names:
+                names.add(pin_name)
+                new_pins.append(pin_cls(self, pin_name, pin_title, x, 0))
+        side_pins.extend(new_pins)
+        return new_pins
+
+    def _layout_pins(self):
+        self.height = max(
+            generate_pos_pins(self.input_pins, 100 - 15, 15),
+            generate_pos_pins(self.output_pins, 100 - 15, 15),
+        )
+        self.half_height = self.height // 2
 
 
 class SelfSpace(Node):
@@ -344,25 +462,29 @@ class SelfSpace(Node):
             output_pins: list[tuple[str, str]],
             node_id: int | None = None,
     ):
-        self.id = node_id or get_new_id()
+        self.id = node_id
         self.x = x
         self.y = y
         self.input_pins = []
         self.output_pins = []
-        for name, title in input_pins:
-            self._new_input_pin(name, title)
-        for name, title in output_pins:
-            self._new_output_pin(name, title)
-        self.height = max(
-            generate_pos_pins(self.input_pins, 100 - 15, 15),
-            generate_pos_pins(self.output_pins, 100 - 15, 15),
-        )
-        self.half_height = self.height // 2
+        self._input_names = set()
+        self._output_names = set()
+        self._add_pins(self.input_pins, self._input_names, InputPin, -self.half_width, input_pins)
+        self._add_pins(self.output_pins, self._output_names, OutputPin, self.half_width, output_pins)
+        self._layout_pins()
 
     @property
     def pins(self) -> Sequence[BasePin]:
         return self.input_pins + self.output_pins
 
+    def attach(self, space: SpaceProtocol):
+        space.sync_input_pins.subscribe(self.add_input_pin_handler, self.remove_input_pin_handler)
+        space.sync_output_pins.subscribe(self.add_output_pin_handler, self.remove_output_pin_handler)
+
+    def detach(self, space: SpaceProtocol):
+        space.sync_input_pins.unsubscribe(self)
+        space.sync_output_pins.unsubscribe(self)
+
     def draw(self, surface: Surface):
         draw_text_top_button(
             surface,
@@ -375,9 +497,8 @@ class SelfSpace(Node):
         for pin in self.pins:
             pin.draw(surface)
 
-    def select_rect(self) -> Rect:
-        x, y = camera.world_to_window(self.x - self.half_width, self.y - self.half_height)
-        return pygame.Rect(x, y, self.width, self.height)
+    def world_rect(self) -> tuple[float, float, int, int]:
+        return self.x - self.half_width, self.y - self.half_height, self.width, self.height
 
     def generate_pos_pins(self, prefix: str):
         pins = [pin for pin in self.pins if pin.name.startswith(prefix)]
@@ -387,43 +508,93 @@ class SelfSpace(Node):
         return [
             ("new input pin", self.on_new_input_pin),
             ("new output pin", self.on_new_output_pin),
-            ("delete node", lambda space: space.del_node(self)),
+            ("delete node", lambda space: history.do(DelNodes(space, [self]))),
         ]
 
     def _new_input_pin(self, pin_name: str, pin_title: str) -> BasePin | None:
-        for pin in self.input_pins:
-            if pin.name == pin_name:
-                return
-        pin = InputPin(self, pin_name, pin_title, -self.half_width, 0)
-        self.input_pins.append(pin)
-        self.height = generate_pos_pins(self.input_pins, self.height - 15, 15)
-        self.half_height = self.height // 2
-        return pin
+        pins = self._new_input_pins([(pin_name, pin_title)])
+        return pins[0] if pins else None
+
+    def _new_input_pins(self, pins: list[tuple[str, str]]) -> list[BasePin]:
+        new_pins = self._add_pins(self.input_pins, self._input_names, InputPin, -self.half_width, pins)
+        if new_pins:
+            self.height = generate_pos_pins(self.input_pins, self.height - 15, 15)
+            self.half_height = self.height // 2
+        return new_pins
 
     def on_new_input_pin(self, space: SpaceProtocol):
         max_int = str(get_max_pin_id(self.input_pins, 'input') + 1)
         pin = self._new_input_pin('input' + max_int, max_int)
         if pin:
             space.sync_input_pins.add_pin(pin.name, max_int)
+            history.push(AddPin(space.sync_input_pins, pin.name))
+
+    def add_input_pin_handler(self, pins: list[tuple[str, str]]):
+        self._new_input_pins(pins)
+        self.update_search()
 
-    def add_input_pin_handler(self, pin_name: str, pin_title: str):
-        self._new_input_pin(pin_name, pin_title)
+    def remove_input_pin_handler(self, pin_names: list[str]) -> list[BasePin]:
+        removed = [pin for pin in self.input_pins if pin.name in pin_names]
+        if removed:
+            self.input_pins = [pin for pin in self.input_pins if pin.name not in pin_names]
+            self._input_names.difference_update(pin_names)
+            self._layout_pins()
+        self.update_search()
+        return removed
 
     def _new_output_pin(self, pin_name: str, pin_title: str) -> BasePin | None:
-        for pin in self.output_pins:
-            if pin.name == pin_name:
-                return
-        pin = OutputPin(self, pin_name, pin_title, self.half_width, 0)
-        self.output_pins.append(pin)
-        self.height = generate_pos_pins(self.output_pins, self.height - 15, 15)
-        self.half_height = self.height // 2
-        return pin
+        pins = self._new_output_pins([(pin_name, pin_title)])
+        return pins[0] if pins else None
+
+    def _new_output_pins(self, pins: list[tuple[str, str]]) -> list[BasePin]:
+        new_pins = self._add_pins(self.output_pins, self._output_names, OutputPin, self.half_width, pins)
+        if new_pins:
+            self.height = generate_pos_pins(self.output_pins, self.height - 15, 15)
+            self.half_height = self.height // 2
+        return new_pins
 
     def on_new_output_pin(self, space: SpaceProtocol):
         max_int = str(get_max_pin_id(self.output_pins, 'output') + 1)
         pin = self._new_output_pin('output' + max_int, max_int)
         if pin:
             space.sync_output_pins.add_pin(pin.name, max_int)
-
-    def add_output_pin_handler(self, pin_name: str, pin_title: str):
-        self._new_output_pin(pin_name, pin_title)
+            history.push(AddPin(space.sync_output_pins, pin.name))
+
+    def add_output_pin_handler(self, pins: list[tuple[str, str]]):
+        self._new_output_pins(pins)
+        self.update_search()
+
+    def remove_output_pin_handler(self, pin_names: list[str]) -> list[BasePin]:
+        removed = [pin for pin in self.output_pins if pin.name in pin_names]
+        if removed:
+            self.output_pins = [pin for pin in self.output_pins if pin.name not in pin_names]
+            self._output_names.difference_update(pin_names)
+            self._layout_pins()
+        self.update_search()
+        return removed
+
+    def restore_pin(self, pin: BasePin):
+        if isinstance(pin, InputPin):
+            self.input_pins.append(pin)
+            self._input_names.add(pin.name)
+        else:
+            self.output_pins.append(pin)
+            self._output_names.add(pin.name)
+        self._layout_pins()
+        self.update_search()
+
+    def _add_pins(self, side_pins: list, names: set[str], pin_cls, x: int, pins: list[tuple[str, str]]) -> list:
+        new_pins = []
+        for pin_name, pin_title in pins:
+            if pin_name not in names:
+                names.add(pin_name)
+                new_pins.append(pin_cls(self, pin_name, pin_title, x, 0))
+        side_pins.extend(new_pins)
+        return new_pins
+
+    def _layout_pins(self):
+        self.height = max(
+            generate_pos_pins(self.input_pins, 100 - 15, 15),
+            generate_pos_pins(self.output_pins, 100 - 15, 15),
+        )
+        self.half_height = self.height // 2
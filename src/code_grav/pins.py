@@ -1,8 +1,7 @@
 import pygame
-from pygame import Surface, Rect
+from pygame import Surface
 
 from code_grav import colors
-from code_grav.camera import camera
 from code_grav.render import draw_button, draw_circle
 from code_grav.space_types import Node, BasePin, BaseNamedPin
 
@@ -18,11 +17,11 @@ class Pin(BasePin):
     def draw(self, surface: Surface):
         draw_button(surface, self.select_rect(), self.text, colors.pin_bg, colors.pin_text)
 
-    def select_rect(self) -> Rect:
+    def world_rect(self) -> tuple[float, float, int, int]:
         half_size = 25
         size = half_size * 2
         x, y = self.node.x + self.x - half_size, self.node.y + self.y - half_size
-        return pygame.Rect(*camera.world_to_window(x, y), size, size)
+        return x, y, size, size
 
 
 class HalfPin(BasePin):
@@ -33,14 +32,13 @@ class HalfPin(BasePin):
         self.y = y
 
     def draw(self, surface: Surface):
-        x, y = self.node.x + self.x, self.node.y + self.y
-        x, y = camera.world_to_window(x, y)
+        x, y = self.select_rect().center
         draw_circle(surface, x, y, radius=self.radius)
 
-    def select_rect(self) -> Rect:
+    def world_rect(self) -> tuple[float, float, int, int]:
         size = self.radius * 2
         x, y = self.node.x + self.x - self.radius, self.node.y + self.y - self.radius
-        return pygame.Rect(*camera.world_to_window(x, y), size, size)
+        return x, y, size, size
 
 
 class InvisiblePin(Pin):
@@ -50,11 +48,11 @@ class InvisiblePin(Pin):
     def draw(self, surface: Surface):
         pass
 
-    def select_rect(self) -> Rect:
+    def world_rect(self) -> tuple[float, float, int, int]:
         half_size = 25
         size = half_size * 2
         x, y = self.node.x + self.x - half_size, self.node.y + self.y - half_size
-        return pygame.Rect(*camera.world_to_window(x, y), size, size)
+        return x, y, size, size
 
 
 class InputPin(BaseNamedPin):
@@ -66,8 +64,7 @@ class InputPin(BaseNamedPin):
         self.title = title
 
     def draw(self, surface: Surface):
-        x, y = self.node.x + self.x, self.node.y + self.y
-        x, y = camera.world_to_window(x, y)
+        x, y = self.select_rect().center
         draw_circle(surface, x, y, radius=self.radius)
         if self.title:
             font = pygame.font.Font(None, 18)
@@ -76,11 +73,11 @@ class InputPin(BaseNamedPin):
             text_y = y - text_surface.get_height() // 2
             surface.blit(text_surface, (text_x, text_y))
 
-    def select_rect(self) -> Rect:
+    def world_rect(self) -> tuple[float, float, int, int]:
         half_size = self.radius
         size = half_size * 2
         x, y = self.node.x + self.x - half_size, self.node.y + self.y - half_size
-        return pygame.Rect(*camera.world_to_window(x, y), size, size)
+        return x, y, size, size
 
 
 class OutputPin(BaseNamedPin):
@@ -92,8 +89,7 @@ class OutputPin(BaseNamedPin):
         self.title = title
 
     def draw(self, surface: Surface):
-        x, y = self.node.x + self.x, self.node.y + self.y
-        x, y = camera.world_to_window(x, y)
+        x, y = self.select_rect().center
         draw_circle(surface, x, y, radius=self.radius)
         if self.title:
             font = pygame.font.Font(None, 18)
@@ -102,8 +98,8 @@ class OutputPin(BaseNamedPin):
             text_y = y - text_surface.get_height() // 2
             surface.blit(text_surface, (text_x, text_y))
 
-    def select_rect(self) -> Rect:
+    def world_rect(self) -> tuple[float, float, int, int]:
         half_size = self.radius
         size = half_size * 2
         x, y = self.node.x + self.x - half_size, self.node.y + self.y - half_size
-        return pygame.Rect(*camera.world_to_window(x, y), size, size)
+        return x, y, size, size
@@ -0,0 +1,290 @@
+import ast
+import operator
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import Executor
+from typing import Any, Callable, Generator, TypeAlias
+
+import pygame
+from pygame import Surface
+
+from code_grav import colors
+from code_grav.graph import independent_branches
+from code_grav.nodes import Const, Operator, SubSpace, Input, Output
+from code_grav.pins import InputPin, OutputPin
+from code_grav.space_types import BaseEdge, BasePin, Node, SpaceProtocol
+
+MAX_DEPTH = 32
+# edges indexed between two checks of the frame budget
+EDGE_STEP = 1024
+
+OPERATORS: dict[str, Callable[[Any, Any], Any]] = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '//': operator.floordiv,
+    '%': operator.mod,
+    '**': operator.pow,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '&': operator.and_,
+    '|': operator.or_,
+    '^': operator.xor,
+    '<<': operator.lshift,
+    '>>': operator.rshift,
+    'and': lambda a, b: a and b,
+    'or': lambda a, b: a or b,
+}
+
+
+# results the preview is willing to build on the UI thread
+MAX_BITS = 1 << 16
+MAX_LENGTH = 1 << 16
+
+# a conversion of printf-style formatting; width and precision pad the result
+FORMAT_SPEC = re.compile(r'%(?:%|(?:\([^)]*\))?[-#0 +]*(\*|\d*)(?:\.(\*|\d*))?)')
+
+
+def too_large(op: str, first: Any, second: Any) -> bool:
+    if op == '**' and isinstance(first, int) and isinstance(second, int):
+        return second > 0 and abs(first) > 1 and first.bit_length() * second > MAX_BITS
+    if op == '<<' and isinstance(first, int) and isinstance(second, int):
+        return first != 0 and first.bit_length() + second > MAX_BITS
+    if op == '*' and isinstance(first, int) and isinstance(second, int):
+        return first.bit_length() + second.bit_length() > MAX_BITS
+    if op == '*':
+        for sequence, count in ((first, second), (second, first)):
+            if isinstance(sequence, (str, bytes, list, tuple)) and isinstance(count, int):
+                return len(sequence) * count > MAX_LENGTH
+    if op == '%' and isinstance(first, (str, bytes)):
+        spec = first if isinstance(first, str) else first.decode('latin-1')
+        for width, precision in FORMAT_SPEC.findall(spec):
+            # a width taken from the arguments is not known until the result is built
+            if '*' in (width, precision) or int(width or 0) > MAX_LENGTH or int(precision or 0) > MAX_LENGTH:
+                return True
+    return False
+
+
+def parse_value(value: str) -> Any:
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+# evaluation yields before each node, so the preview can stop inside a large
+# SubSpace when the frame budget runs out and resume there on the next frame
+Steps: TypeAlias = Generator[None, None, Any]
+
+
+def evaluate_node(node: Node, inputs: dict[str, Any], depth: int = 0, profile=None) -> dict[str, Any]:
+    return _run(node_steps(node, inputs, depth, profile))
+
+
+def evaluate_space(space: SpaceProtocol, inputs: dict[str, Any], depth: int = 0, profile=None) -> dict[str, Any]:
+    return _run(space_steps(space, inputs, depth, profile))
+
+
+def evaluate_parallel(space: SpaceProtocol, inputs: dict[str, Any], executor: Executor) -> dict[str, Any]:
+    # branches that only meet at Input and Output share no values, so the ones
+    # holding a SubSpace run on the pool and the rest inline while they do
+    incoming = _incoming_edges(space)
+    values = _evaluate_nodes([space.input_node], incoming, {}, inputs)
+    futures = []
+    branch_values = []
+    for nodes in independent_branches(space):
+        if any(isinstance(node, SubSpace) for node in nodes):
+            futures.append(executor.submit(_evaluate_nodes, nodes, incoming, dict(values), inputs))
+        else:
+            branch_values.append(_evaluate_nodes(nodes, incoming, dict(values), inputs))
+    for result in branch_values + [future.result() for future in futures]:
+        values.update(result)
+    return _collect_inputs(space.output_node, incoming, values)
+
+
+def node_steps(node: Node, inputs: dict[str, Any], depth: int = 0, profile=None) -> Steps:
+    if isinstance(node, Const):
+        return {'output': parse_value(node.value)}
+    elif isinstance(node, Operator):
+        func = OPERATORS.get(node.value)
+        first, second = inputs.get('first'), inputs.get('second')
+        if func is None or first is None or second is None or too_large(node.value, first, second):
+            return {}
+        try:
+            return {'output': func(first, second)}
+        except Exception:
+            return {}
+    elif isinstance(node, SubSpace):
+        space = node.space
+        if space is None:
+            return {}
+        return (yield from space_steps(space, inputs, depth + 1, profile))
+    return {}
+
+
+def space_steps(space: SpaceProtocol, inputs: dict[str, Any], depth: int = 0, profile=None) -> Steps:
+    if depth > MAX_DEPTH:
+        return {}
+    incoming: dict[BasePin, list[BaseEdge]] = defaultdict(list)
+    for i, edge in enumerate(space.edges):
+        if not i % EDGE_STEP:
+            yield
+        incoming[edge.end].append(edge)
+    values = yield from _nodes_steps(space.order.nodes, incoming, {}, inputs, depth, profile)
+    return _collect_inputs(space.output_node, incoming, values)
+
+
+def _run(steps: Steps) -> Any:
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+
+def _evaluate_nodes(nodes: list[Node], incoming: dict[BasePin, list[BaseEdge]], values: dict[BasePin, Any],
+                    inputs: dict[str, Any]) -> dict[BasePin, Any]:
+    return _run(_nodes_steps(nodes, incoming, values, inputs))
+
+
+def _nodes_steps(nodes: list[Node], incoming: dict[BasePin, list[BaseEdge]], values: dict[BasePin, Any],
+                 inputs: dict[str, Any], depth: int = 0, profile=None) -> Steps:
+    for node in nodes:
+        yield
+        if profile:
+            profile.enter(node)
+        if isinstance(node, Input):
+            outputs = inputs
+        else:
+            outputs = yield from node_steps(node, _collect_inputs(node, incoming, values), depth, profile)
+        if profile:
+            profile.leave()
+        for pin in node.pins:
+            if isinstance(pin, OutputPin) and outputs.get(pin.name) is not None:
+                values[pin] = outputs[pin.name]
+    return values
+
+
+def _incoming_edges(space: SpaceProtocol) -> dict[BasePin, list[BaseEdge]]:
+    incoming: dict[BasePin, list[BaseEdge]] = defaultdict(list)
+    for edge in space.edges:
+        incoming[edge.end].append(edge)
+    return incoming
+
+
+def _collect_inputs(node: Node, incoming: dict[BasePin, list[BaseEdge]], values: dict[BasePin, Any]) -> dict[str, Any]:
+    inputs = {}
+    for pin in node.pins:
+        if isinstance(pin, InputPin) and pin in incoming:
+            pin_values = [values.get(edge.start) for edge in incoming[pin]]
+            if pin_values and None not in pin_values and all(v == pin_values[0] for v in pin_values):
+                inputs[pin.name] = pin_values[0]
+    return inputs
+
+
+class Preview:
+    def __init__(self, budget: float = 0.004):
+        self.budget = budget
+        self.values: dict[BasePin, Any] = {}
+        self._space: SpaceProtocol | None = None
+        self._incoming: dict[BasePin, list[BaseEdge]] = defaultdict(list)
+        self._outgoing: dict[BasePin, list[BaseEdge]] = defaultdict(list)
+        self._dirty: dict[Node, None] = {}
+        # the node being evaluated across frames, with where it stopped
+        self._pending: tuple[Node, Steps] | None = None
+
+    def reset(self):
+        self._space = None
+        self._pending = None
+
+    def _rebuild(self, space: SpaceProtocol):
+        self._space = space
+        self.values = {}
+        self._incoming = defaultdict(list)
+        self._outgoing = defaultdict(list)
+        for edge in space.edges:
+            self._incoming[edge.end].append(edge)
+            self._outgoing[edge.start].append(edge)
+        self._dirty = dict.fromkeys(space.nodes.values())
+        self._pending = None
+
+    def node_added(self, node: Node):
+        if self._space is None:
+            return
+        self._dirty[node] = None
+
+    def edge_added(self, edge: BaseEdge):
+        if self._space is None:
+            return
+        self._incoming[edge.end].append(edge)
+        self._outgoing[edge.start].append(edge)
+        self._dirty[edge.end.node] = None
+
+    def nodes_removed(self, nodes: list[Node], edges: list[BaseEdge]):
+        if self._space is None:
+            return
+        for edge in edges:
+            self._incoming[edge.end].remove(edge)
+            self._outgoing[edge.start].remove(edge)
+            self._dirty[edge.end.node] = None
+        for node in nodes:
+            for pin in node.pins:
+                self.values.pop(pin, None)
+            self._dirty.pop(node, None)
+            if self._pending is not None and self._pending[0] is node:
+                self._pending = None
+
+    def update(self, space: SpaceProtocol):
+        if space is not self._space:
+            self._rebuild(space)
+        deadline = time.perf_counter() + self.budget
+        while time.perf_counter() < deadline:
+            if self._pending is not None and self._pending[0] in self._dirty:
+                # its inputs changed while it was halfway, so it starts over
+                self._pending = None
+            if self._pending is None:
+                if not self._dirty:
+                    break
+                node = next(iter(self._dirty))
+                del self._dirty[node]
+                if isinstance(node, (Input, Output)) or space.nodes.get(node.id) is not node:
+                    continue
+                self._pending = node, node_steps(node, _collect_inputs(node, self._incoming, self.values))
+            node, steps = self._pending
+            try:
+                next(steps)
+                continue
+            except StopIteration as stop:
+                outputs = stop.value
+            self._pending = None
+            for pin in node.pins:
+                if not isinstance(pin, OutputPin):
+                    continue
+                value = outputs.get(pin.name)
+                if value is None:
+                    if self.values.pop(pin, None) is None:
+                        continue
+                elif pin in self.values and self.values[pin] == value:
+                    continue
+                else:
+                    self.values[pin] = value
+                for edge in self._outgoing[pin]:
+                    self._dirty[edge.end.node] = None
+
+    def draw(self, surface: Surface):
+        if not self.values:
+            return
+        font = pygame.font.Font(None, 18)
+        bounds = surface.get_rect()
+        for pin, value in self.values.items():
+            rect = pin.select_rect()
+            if not bounds.colliderect(rect):
+                continue
+            text_surface = font.render(str(value), True, colors.preview_text)
+            surface.blit(text_surface, (rect.right + 6, rect.centery - text_surface.get_height() // 2))
@@ -0,0 +1,47 @@
+import atexit
+import cProfile
+import os
+import time
+import tracemalloc
+
+
+class SessionProfiler:
+    def __init__(self, filepath: str | None, top: int = 30):
+        self.basepath = os.path.splitext(filepath)[0] if filepath else 'CodeGrav'
+        self.top = top
+        self._profile: cProfile.Profile | None = None
+
+    @property
+    def active(self) -> bool:
+        return self._profile is not None
+
+    def toggle(self):
+        if self.active:
+            self.stop()
+        else:
+            self.start()
+
+    def start(self):
+        if self.active:
+            return
+        tracemalloc.start()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        atexit.register(self.stop)
+
+    def stop(self) -> str | None:
+        if not self.active:
+            return None
+        self._profile.disable()
+        atexit.unregister(self.stop)
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        path = f'{self.basepath}-{time.strftime("%Y%m%d-%H%M%S")}'
+        self._profile.dump_stats(path + '.pstats')
+        self._profile = None
+        with open(path + '.alloc.txt', 'w') as f:
+            stats = snapshot.statistics('lineno')
+            f.write(f'total: {sum(s.size for s in stats) / 1024:.1f} KiB in {sum(s.count for s in stats)} blocks\n')
+            for stat in stats[:self.top]:
+                f.write(f'{stat}\n')
+        return path
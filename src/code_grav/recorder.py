@@ -0,0 +1,41 @@
+import json
+from typing import Iterator
+
+import pygame
+
+
+def _is_plain(value) -> bool:
+    if isinstance(value, (tuple, list)):
+        return all(_is_plain(v) for v in value)
+    return value is None or isinstance(value, (bool, int, float, str))
+
+
+def event_to_dict(event) -> dict:
+    return {
+        'type': event.type,
+        'dict': {key: value for key, value in event.dict.items() if _is_plain(value)},
+    }
+
+
+def dict_to_event(data: dict):
+    attrs = {key: tuple(value) if isinstance(value, list) else value for key, value in data['dict'].items()}
+    return pygame.event.Event(data['type'], attrs)
+
+
+class Recorder:
+    def __init__(self, filepath: str):
+        self._file = open(filepath, 'w', buffering=1)
+
+    def record(self, events: list, now: int):
+        self._file.write(json.dumps({'t': now, 'events': [event_to_dict(e) for e in events]}) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+def load_recording(filepath: str) -> Iterator[tuple[int, list]]:
+    with open(filepath, 'r') as f:
+        for line in f:
+            if line.strip():
+                frame = json.loads(line)
+                yield frame['t'], [dict_to_event(e) for e in frame['events']]
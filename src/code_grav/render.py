@@ -1,3 +1,5 @@
+import time
+
 import pygame
 
 from code_grav import colors
@@ -81,3 +83,23 @@ def draw_dashed_rect(surface, color, rect, width=1, dash_length=5):
             start_pos = (p1[0] + int(dx * start), p1[1] + int(dy * start))
             end_pos = (p1[0] + int(dx * end), p1[1] + int(dy * end))
             pygame.draw.line(surface, color, start_pos, end_pos, width)
+
+
+def draw_space(surface, space, stats=None):
+    if not stats or not stats.enabled:
+        pygame.transform.smoothscale(surface, surface.get_size())
+        surface.fill(colors.space)
+        for obj in space.objects:
+            obj.draw(surface)
+        return
+
+    with stats.phase('clear'):
+        pygame.transform.smoothscale(surface, surface.get_size())
+        surface.fill(colors.space)
+    timer = time.perf_counter
+    for obj in space.objects:
+        start = timer()
+        obj.draw(surface)
+        stats.add('draw ' + type(obj).__name__, timer() - start)
+    stats.count('nodes', len(space.nodes))
+    stats.count('edges', len(space.edges))
@@ -0,0 +1,44 @@
+import pygame
+
+from code_grav import app, file_manager
+from code_grav.events import EventManager
+from code_grav.frame_stats import frame_stats
+from code_grav.ids import IdAllocator
+from code_grav.profiling import SessionProfiler
+from code_grav.recorder import load_recording
+from code_grav.render import draw_space
+from code_grav.space import Space
+from code_grav.space_manager import SpaceManager
+
+
+def replay(recording_path: str, filepath: str | None):
+    window = app.Window.get()
+    if filepath:
+        space_manager = file_manager.load_or_new(filepath)
+    else:
+        space_manager = SpaceManager(Space([('input1', '1')], [('output1', '1')], IdAllocator()))
+    events = EventManager(space_manager, None, SessionProfiler(None))
+    frame_stats.reset(maxlen=None)
+    frame_stats.enabled = True
+    try:
+        for now, frame_events in load_recording(recording_path):
+            frame_stats.begin_frame()
+            draw_space(window.surface, space_manager.space, frame_stats)
+            events.trigger_events(frame_events, now)
+            with frame_stats.phase('flip'):
+                pygame.display.flip()
+            frame_stats.end_frame()
+    except SystemExit:
+        pass
+
+
+def report() -> str:
+    frames = frame_stats.phases['frame']
+    if not frames:
+        return 'no frames'
+    lines = [
+        f'frames: {len(frames)}  total: {sum(frames) * 1000:.1f} ms  fps: {frame_stats.fps():.1f}',
+    ]
+    for name, values in sorted(frame_stats.snapshot()['phases'].items()):
+        lines.append(f'{name}: mean {values["mean"]:.2f} ms  p50 {values["p50"]:.2f} ms  p99 {values["p99"]:.2f} ms')
+    return '\n'.join(lines)
@@ -0,0 +1,95 @@
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from code_grav.space_types import Node
+
+_SPLIT = re.compile(r'\s+')
+
+
+def tokenize(text: str) -> set[str]:
+    text = text.lower().strip()
+    if not text:
+        return set()
+    return {text, *_SPLIT.split(text)}
+
+
+def node_terms(node: Node) -> set[str]:
+    terms = {type(node).__name__.lower()}
+    value = getattr(node, 'value', None)
+    if value is not None:
+        terms |= tokenize(str(value))
+    for pin in node.pins:
+        title = getattr(pin, 'title', None)
+        if title:
+            terms |= tokenize(title)
+    return terms
+
+
+class SearchIndex:
+    def __init__(self):
+        self._postings: dict[str, set[int]] = defaultdict(set)
+        self._sorted_terms: list[str] = []
+        self._node_terms: dict[int, set[str]] = {}
+        self._nodes: dict[int, Node] = {}
+
+    def __len__(self) -> int:
+        return len(self._node_terms)
+
+    def add(self, node: Node):
+        terms = node_terms(node)
+        self._node_terms[node.id] = terms
+        self._nodes[node.id] = node
+        for term in terms:
+            postings = self._postings[term]
+            if not postings:
+                insort(self._sorted_terms, term)
+            postings.add(node.id)
+
+    def add_many(self, nodes: list[Node]):
+        # one sort of the term list instead of an insertion per new term
+        new_terms = []
+        for node in nodes:
+            terms = node_terms(node)
+            self._node_terms[node.id] = terms
+            self._nodes[node.id] = node
+            for term in terms:
+                postings = self._postings[term]
+                if not postings:
+                    new_terms.append(term)
+                postings.add(node.id)
+        if new_terms:
+            self._sorted_terms.extend(new_terms)
+            self._sorted_terms.sort()
+
+    def remove(self, node: Node):
+        self._nodes.pop(node.id, None)
+        for term in self._node_terms.pop(node.id, ()):
+            postings = self._postings[term]
+            postings.discard(node.id)
+            if not postings:
+                del self._postings[term]
+                del self._sorted_terms[bisect_left(self._sorted_terms, term)]
+
+    def update(self, node: Node):
+        # ids are per document, so a node of another document may share this id
+        if self._nodes.get(node.id) is node:
+            self.remove(node)
+            self.add(node)
+
+    def _prefix(self, prefix: str) -> set[int]:
+        result = set()
+        i = bisect_left(self._sorted_terms, prefix)
+        while i < len(self._sorted_terms) and self._sorted_terms[i].startswith(prefix):
+            result |= self._postings[self._sorted_terms[i]]
+            i += 1
+        return result
+
+    def query(self, text: str, limit: int | None = None) -> list[int]:
+        terms = _SPLIT.split(text.lower().strip())
+        if not terms or not terms[0]:
+            return []
+        # rarest term first keeps the intersection small
+        matches = sorted((self._prefix(term) for term in terms), key=len)
+        result = matches[0].intersection(*matches[1:])
+        return sorted(result)[:limit]
@@ -0,0 +1,58 @@
+import os
+
+import pygame
+from pygame import Rect, Surface
+
+from code_grav import colors
+from code_grav.camera import camera
+from code_grav.space import Space
+
+MARGIN = 100
+
+
+def world_bounds(space: Space) -> Rect:
+    rects = [node.select_rect() for node in space.nodes.values()]
+    rect = rects[0].unionall(rects[1:])
+    rect.move_ip(camera.x - camera.half_w, camera.y - camera.half_h)
+    return rect.inflate(MARGIN * 2, MARGIN * 2)
+
+
+def render_region(space: Space, region: Rect, surface: Surface | None = None) -> Surface:
+    if surface is None:
+        surface = Surface(region.size)
+    saved = camera.x, camera.y
+    camera.x = region.left + camera.half_w
+    camera.y = region.top + camera.half_h
+    try:
+        surface.fill(colors.space)
+        bounds = surface.get_rect()
+        for node in space.nodes.values():
+            if bounds.colliderect(node.select_rect()):
+                node.draw(surface)
+        for edge in space.edges:
+            start, end = edge.start.select_rect(), edge.end.select_rect()
+            if bounds.colliderect(start.union(end)):
+                edge.draw(surface)
+    finally:
+        camera.x, camera.y = saved
+    return surface
+
+
+def export_png(space: Space, filepath: str, region: Rect | None = None, tile_size: int = 4096) -> list[str]:
+    if region is None:
+        region = world_bounds(space)
+    if region.width <= tile_size and region.height <= tile_size:
+        pygame.image.save(render_region(space, region), filepath)
+        return [filepath]
+
+    base, ext = os.path.splitext(filepath)
+    tile = Surface((tile_size, tile_size))
+    paths = []
+    for row, top in enumerate(range(region.top, region.bottom, tile_size)):
+        for col, left in enumerate(range(region.left, region.right, tile_size)):
+            tile_region = Rect(left, top, tile_size, tile_size).clip(region)
+            surface = tile if tile_region.size == tile.get_size() else Surface(tile_region.size)
+            path = f'{base}_{row}_{col}{ext}'
+            pygame.image.save(render_region(space, tile_region, surface), path)
+            paths.append(path)
+    return paths
@@ -3,16 +3,20 @@ from typing import Iterator
 import pygame
 from pygame import Surface
 
+from code_grav.camera import camera
+from code_grav.graph import DynamicOrder
+from code_grav.minimap import Overview
+from code_grav.ids import IdAllocator
 from code_grav.nodes import SubSpace, Input, Output
 from code_grav.sync_pins import SyncPins
 from code_grav.render import draw_arrow
 from code_grav.space_types import Drawable, Node, Clickable, BasePin, BaseEdge
-from code_grav.utils import get_new_id, get_pin_by_name
+from code_grav.spatial import SegmentIndex
+from code_grav.utils import get_pin_by_name
 
 
 class Edge(BaseEdge):
-    def __init__(self, start: BasePin, end: BasePin, edge_id: int | None = None):
-        self.id = edge_id or get_new_id()
+    def __init__(self, start: BasePin, end: BasePin):
         self.start: BasePin = start
         self.end: BasePin = end
 
@@ -21,14 +25,26 @@ class Edge(BaseEdge):
 
 
 class Space:
-    def __init__(self, input_pins: list[tuple[str, str]], output_pins: list[tuple[str, str]]):
+    def __init__(
+            self,
+            input_pins: list[tuple[str, str]],
+            output_pins: list[tuple[str, str]],
+            ids: IdAllocator,
+            input_id: int | None = None,
+            output_id: int | None = None,
+    ):
         self.nodes: dict[int, Node] = {}
+        # every space of a document shares its ids; library modules have their own
+        self.ids = ids
         self.edges: list[Edge] = []
+        self.edge_index = SegmentIndex()
+        self.overview = Overview()
+        self.order = DynamicOrder()
         self.sync_input_pins = SyncPins()
-        self.input_node = Input(self.sync_input_pins, -200, 0, input_pins)
+        self.input_node = Input(self.sync_input_pins, -200, 0, input_pins, input_id)
         self.add_node(self.input_node)
         self.sync_output_pins = SyncPins()
-        self.output_node = Output(self.sync_output_pins, 200, 0, output_pins)
+        self.output_node = Output(self.sync_output_pins, 200, 0, output_pins, output_id)
         self.add_node(self.output_node)
 
     @property
@@ -51,7 +67,13 @@ class Space:
                     if rect.collidepoint(event.pos):
                         return pin, rect
 
+    def was_select_edge(self, event) -> Edge | None:
+        if self.edge_index.dirty:
+            self.edge_index.rebuild(self.edges)
+        return self.edge_index.hit(*camera.window_to_world(*event.pos))
+
     def new_subspace_from_nodes(self, x, y, node_ids: list[int]) -> SubSpace:
+        node_ids = set(node_ids)
         input_pins: list[tuple[str, str]] = []
         output_pins: list[tuple[str, str]] = []
         for edge in self.edges:
@@ -63,7 +85,7 @@ class Space:
                     i = str(len(input_pins) + 1)
                     input_pins.append(('input' + i, i))
 
-        new_space = Space(input_pins, output_pins)
+        new_space = Space(input_pins, output_pins, self.ids)
         ss = SubSpace(x, y, new_space, input_pins, output_pins)
 
         new_edges = []
@@ -88,30 +110,100 @@ class Space:
                 new_edges.append(edge)
 
         self.edges = new_edges
+        self.edge_index.invalidate()
+        new_space.edge_index.invalidate()
+        self.overview.invalidate()
+        new_space.overview.invalidate()
 
         for node_id in node_ids:
             if node_id in self.nodes:
-                new_space.nodes[node_id] = self.nodes.pop(node_id)
+                node = self.nodes.pop(node_id)
+                node.detach(self)
+                new_space.add_node(node)
 
         self.add_node(ss)
-
-        ss.space.sync_input_pins.add_handlers.append(ss.add_input_pin_handler)
-        ss.space.sync_output_pins.add_handlers.append(ss.add_output_pin_handler)
+        self.order.rebuild(self)
+        new_space.order.rebuild(new_space)
         return ss
 
-    def add_connect(self, start: BasePin, end: BasePin):
+    def add_connect(self, start: BasePin, end: BasePin) -> Edge:
         edge = Edge(start, end)
         self.edges.append(edge)
+        self.edge_index.add(edge)
+        self.overview.update(edges=[edge])
+        self.order.add_edge(edge)
+        return edge
 
     def add_node(self, node: Node):
+        self._adopt(node)
         self.nodes[node.id] = node
-
-    def del_node(self, node: Node):
-        del self.nodes[node.id]
-        need_del_edges = set()
-        for pin in node.pins:
-            for edge in self.edges:
-                if pin in [edge.start, edge.end]:
-                    need_del_edges.add(edge)
+        self.order.add_node(node)
+        node.attach(self)
+        self.overview.update([node])
+        self.ids.register(self, node)
+
+    def add_nodes(self, nodes: list[Node]):
+        for node in nodes:
+            self._adopt(node)
+            self.nodes[node.id] = node
+            self.order.add_node(node)
+            node.attach(self)
+        self.overview.update(nodes)
+        self.ids.register_many(self, nodes)
+
+    def _adopt(self, node: Node):
+        if node.id is None:
+            node.id = self.ids.new_id()
+        node.ids = self.ids
+
+    def add_edges(self, edges: list[Edge]):
+        self.edges.extend(edges)
+        self.edge_index.update(edges)
+        self.overview.update(edges=edges)
+        for edge in edges:
+            self.order.add_edge(edge)
+
+    def remove_edges(self, edges: list[Edge]):
+        need_del_edges = set(edges)
+        self.edges = [edge for edge in self.edges if edge not in need_del_edges]
         for edge in need_del_edges:
-            self.edges.remove(edge)
+            self.edge_index.remove(edge)
+            self.overview.remove(edge)
+            self.order.remove_edge(edge)
+
+    def nodes_moved(self, nodes: list[Node]):
+        node_ids = {node.id for node in nodes}
+        edges = [
+            edge for edge in self.edges
+            if edge.start.node.id in node_ids or edge.end.node.id in node_ids
+        ]
+        self.edge_index.update(edges)
+        self.overview.update(nodes, edges)
+
+    def del_node(self, node: Node) -> list[Edge]:
+        return self.del_nodes([node])
+
+    def del_nodes(self, nodes: list[Node]) -> list[Edge]:
+        pins = set()
+        for node in nodes:
+            del self.nodes[node.id]
+            node.detach(self)
+            self.overview.remove(node)
+            self.ids.unregister(node)
+            pins.update(node.pins)
+        need_del_edges = [edge for edge in self.edges if edge.start in pins or edge.end in pins]
+        if need_del_edges:
+            self.remove_edges(need_del_edges)
+        for node in nodes:
+            self.order.remove_node(node)
+        return need_del_edges
+
+
+def iter_spaces(space: Space) -> Iterator[Space]:
+    stack = [space]
+    while stack:
+        space = stack.pop()
+        yield space
+        for node in space.nodes.values():
+            if isinstance(node, SubSpace) and node.owned_space is not None:
+                stack.append(node.owned_space)
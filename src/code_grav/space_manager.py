@@ -1,6 +1,9 @@
 from code_grav.camera import camera
+from code_grav.ids import IdAllocator
 from code_grav.space import Space, SubSpace
+from code_grav.space_types import Node
 from code_grav.utils import get_common_center
+from code_grav.workspace import current_workspace
 
 
 class SpaceManager:
@@ -18,14 +21,53 @@ class SpaceManager:
     def root_space(self):
         return self._spaces[0]
 
+    @property
+    def ids(self) -> IdAllocator:
+        return self._spaces[0].ids
+
+    def reset(self, space: Space):
+        self._spaces = [space]
+        space.edge_index.invalidate()
+
+    def root_view(self) -> tuple[float, float]:
+        # inside a subspace the root view is where the camera returns to on the way out
+        if len(self._spaces) > 1:
+            return self._spaces[1].x, self._spaces[1].y
+        return camera.x, camera.y
+
     def apply(self, sub_space: SubSpace):
+        if sub_space.ref is not None:
+            # a module being edited stays loaded until it is saved
+            current_workspace().open(sub_space.ref)
         self._spaces.append(sub_space)
+        sub_space.space.edge_index.invalidate()
         x, y = get_common_center(sub_space.space.nodes.values())
         camera.x, camera.y = camera.window_to_world(x, y)
 
+    def focus(self, node_id: int) -> Node | None:
+        found = self.ids.find(node_id)
+        if not found:
+            return None
+        space, node = found
+        self._spaces = self._spaces[:1] + self.ids.path(space)
+        self.space.edge_index.invalidate()
+        camera.x, camera.y = node.x, node.y
+        return node
+
+    def prune(self):
+        # drop subspaces that no longer exist, e.g. after the file was changed on disk
+        for i in range(1, len(self._spaces)):
+            parent = self._spaces[i - 1]
+            parent = parent.space if isinstance(parent, SubSpace) else parent
+            if parent.nodes.get(self._spaces[i].id) is not self._spaces[i]:
+                del self._spaces[i:]
+                break
+        self.space.edge_index.invalidate()
+
     def rollback(self) -> bool:
         if len(self._spaces) > 1:
             ss = self._spaces.pop()
+            self.space.edge_index.invalidate()
             if isinstance(ss, SubSpace):
                 camera.x = ss.x
                 camera.y = ss.y
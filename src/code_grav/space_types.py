@@ -1,12 +1,21 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Protocol, TypeAlias, Sequence
+from typing import TYPE_CHECKING, Callable, Protocol, TypeAlias, Sequence
 
 from pygame import Rect, Surface
 
+from code_grav.camera import camera
 from code_grav.sync_pins import SyncPins
 
+if TYPE_CHECKING:
+    from code_grav.graph import DynamicOrder
+    from code_grav.ids import IdAllocator
+    from code_grav.minimap import Overview
+
 
 class SpaceProtocol(Protocol):
+    order: 'DynamicOrder'
+    ids: 'IdAllocator'
+    overview: 'Overview'
     sync_input_pins: SyncPins
     sync_output_pins: SyncPins
     input_node: 'Node'
@@ -19,7 +28,31 @@ class SpaceProtocol(Protocol):
         pass
 
     @abstractmethod
-    def del_node(self, node: 'Node'):
+    def add_nodes(self, nodes: list['Node']):
+        pass
+
+    @abstractmethod
+    def del_node(self, node: 'Node') -> list['BaseEdge']:
+        pass
+
+    @abstractmethod
+    def del_nodes(self, nodes: list['Node']) -> list['BaseEdge']:
+        pass
+
+    @abstractmethod
+    def add_connect(self, start: 'BasePin', end: 'BasePin') -> 'BaseEdge':
+        pass
+
+    @abstractmethod
+    def add_edges(self, edges: list['BaseEdge']):
+        pass
+
+    @abstractmethod
+    def remove_edges(self, edges: list['BaseEdge']):
+        pass
+
+    @abstractmethod
+    def nodes_moved(self, nodes: list['Node']):
         pass
 
 
@@ -27,10 +60,28 @@ ContextMenuItems: TypeAlias = list[tuple[str, Callable[[SpaceProtocol], None]]]
 
 
 class Clickable(ABC):
+    layout_version: int
+    _world_version = -1
+    _world: tuple[float, float, int, int]
+    _camera_version = -1
+    _rect: Rect
+
     @abstractmethod
-    def select_rect(self) -> Rect:
+    def world_rect(self) -> tuple[float, float, int, int]:
         pass
 
+    def select_rect(self) -> Rect:
+        # the same rect is handed to every caller until the object or the camera moves, so it must not be changed in place
+        if self._world_version != self.layout_version:
+            self._world_version = self.layout_version
+            self._world = self.world_rect()
+            self._camera_version = -1
+        if self._camera_version != camera.version:
+            self._camera_version = camera.version
+            x, y, width, height = self._world
+            self._rect = Rect(*camera.world_to_window(x, y), width, height)
+        return self._rect
+
 
 class Drawable(ABC):
     id: int
@@ -47,15 +98,42 @@ class BasePin(Drawable, Clickable, ABC):
     name: str
     radius: int = 15
 
+    @property
+    def layout_version(self) -> int:
+        # pins are laid out relative to their node, so they move with it
+        return self.node.layout_version
+
 
 class BaseNamedPin(BasePin, ABC):
     title: str
 
 
 class Node(Clickable, Drawable, ABC):
-    id: int
-    x: int
-    y: int
+    # None until the node is added to a space, which numbers it from the ids of its document
+    id: int | None
+    ids: 'IdAllocator | None' = None
+    # bumped when the node moves or lays out its pins again
+    layout_version = 0
+    _x = 0
+    _y = 0
+
+    @property
+    def x(self) -> int:
+        return self._x
+
+    @x.setter
+    def x(self, value: int):
+        self._x = value
+        self.layout_version += 1
+
+    @property
+    def y(self) -> int:
+        return self._y
+
+    @y.setter
+    def y(self, value: int):
+        self._y = value
+        self.layout_version += 1
 
     @abstractmethod
     def get_context_menu_items(self) -> ContextMenuItems:
@@ -66,6 +144,17 @@ class Node(Clickable, Drawable, ABC):
     def pins(self) -> Sequence[BasePin]:
         pass
 
+    def update_search(self):
+        # pins are search terms, so a node whose pins change is indexed again
+        if self.ids is not None:
+            self.ids.search.update(self)
+
+    def attach(self, space: SpaceProtocol):
+        pass
+
+    def detach(self, space: SpaceProtocol):
+        pass
+
 
 class BaseEdge(Drawable, ABC):
     start: BasePin
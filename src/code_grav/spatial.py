@@ -0,0 +1,124 @@
+import math
+from collections import defaultdict
+
+from code_grav.space_types import BaseEdge, BasePin
+
+CELL_SIZE = 256
+LEVELS = 4
+MAX_CELLS = 64
+HIT_DISTANCE = 8
+
+
+def pin_position(pin: BasePin) -> tuple[int, int]:
+    return pin.node.x + pin.x, pin.node.y + pin.y
+
+
+def edge_segment(edge: BaseEdge) -> tuple[int, int, int, int]:
+    return *pin_position(edge.start), *pin_position(edge.end)
+
+
+def segment_distance(px: float, py: float, x1: float, y1: float, x2: float, y2: float) -> float:
+    dx, dy = x2 - x1, y2 - y1
+    length = dx * dx + dy * dy
+    t = max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / length)) if length else 0.0
+    return math.hypot(px - x1 - t * dx, py - y1 - t * dy)
+
+
+def segment_cells(x1: float, y1: float, x2: float, y2: float, size: int) -> list[tuple[int, int]]:
+    # grid traversal (Amanatides & Woo): only the cells the segment actually crosses
+    cx, cy = int(x1 // size), int(y1 // size)
+    end_x, end_y = int(x2 // size), int(y2 // size)
+    dx, dy = x2 - x1, y2 - y1
+    step_x = 1 if dx > 0 else -1
+    step_y = 1 if dy > 0 else -1
+    t_delta_x = abs(size / dx) if dx else math.inf
+    t_delta_y = abs(size / dy) if dy else math.inf
+    t_max_x = ((cx + (dx > 0)) * size - x1) / dx if dx else math.inf
+    t_max_y = ((cy + (dy > 0)) * size - y1) / dy if dy else math.inf
+    cells = [(cx, cy)]
+    for _ in range(abs(end_x - cx) + abs(end_y - cy)):
+        if t_max_x < t_max_y:
+            t_max_x += t_delta_x
+            cx += step_x
+        else:
+            t_max_y += t_delta_y
+            cy += step_y
+        cells.append((cx, cy))
+    return cells
+
+
+class SegmentIndex:
+    # long segments go to coarser grids (each level doubles the cell size) so
+    # that no edge occupies more than MAX_CELLS cells
+    def __init__(self, cell_size: int = CELL_SIZE, levels: int = LEVELS):
+        self.sizes = [cell_size * 2 ** level for level in range(levels)]
+        # built lazily on the first query, so bulk loads never pay for it
+        self.dirty = True
+        self._cells: dict[tuple[int, int, int], set[BaseEdge]] = defaultdict(set)
+        self._edge_cells: dict[BaseEdge, list[tuple[int, int, int]]] = {}
+        self._segments: dict[BaseEdge, tuple[int, int, int, int]] = {}
+        self._level_counts = [0] * levels
+
+    def __len__(self) -> int:
+        return len(self._edge_cells)
+
+    def invalidate(self):
+        self.dirty = True
+
+    def rebuild(self, edges: list[BaseEdge]):
+        self._cells = defaultdict(set)
+        self._edge_cells = {}
+        self._segments = {}
+        self._level_counts = [0] * len(self.sizes)
+        self.dirty = False
+        for edge in edges:
+            self.add(edge)
+
+    def add(self, edge: BaseEdge):
+        if self.dirty:
+            return
+        if edge in self._edge_cells:
+            self.remove(edge)
+        x1, y1, x2, y2 = edge_segment(edge)
+        for level, size in enumerate(self.sizes):
+            if abs(x2 // size - x1 // size) + abs(y2 // size - y1 // size) < MAX_CELLS:
+                break
+        cells = [(level, cx, cy) for cx, cy in segment_cells(x1, y1, x2, y2, size)]
+        self._edge_cells[edge] = cells
+        self._segments[edge] = x1, y1, x2, y2
+        self._level_counts[level] += 1
+        for cell in cells:
+            self._cells[cell].add(edge)
+
+    def remove(self, edge: BaseEdge):
+        cells = self._edge_cells.pop(edge, None)
+        if not cells:
+            return
+        del self._segments[edge]
+        self._level_counts[cells[0][0]] -= 1
+        for cell in cells:
+            edges = self._cells[cell]
+            edges.discard(edge)
+            if not edges:
+                del self._cells[cell]
+
+    def update(self, edges: list[BaseEdge]):
+        for edge in edges:
+            self.add(edge)
+
+    def hit(self, x: float, y: float, distance: float = HIT_DISTANCE) -> BaseEdge | None:
+        candidates = set()
+        for level, size in enumerate(self.sizes):
+            if not self._level_counts[level]:
+                continue
+            for cx in range(int((x - distance) // size), int((x + distance) // size) + 1):
+                for cy in range(int((y - distance) // size), int((y + distance) // size) + 1):
+                    candidates.update(self._cells.get((level, cx, cy), ()))
+        best, best_distance = None, distance
+        for edge in candidates:
+            x1, y1, x2, y2 = self._segments[edge]
+            if min(x1, x2) - distance <= x <= max(x1, x2) + distance and min(y1, y2) - distance <= y <= max(y1, y2) + distance:
+                current = segment_distance(x, y, x1, y1, x2, y2)
+                if current <= best_distance:
+                    best, best_distance = edge, current
+        return best
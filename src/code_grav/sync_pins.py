@@ -1,10 +1,39 @@
 from typing import Callable
+from weakref import WeakKeyDictionary
+
+AddPinsHandler = Callable[[list[tuple[str, str]]], None]
+RemovePinsHandler = Callable[[list[str]], list]
 
 
 class SyncPins:
     def __init__(self):
-        self.add_handlers: list[Callable[[str, str], None]] = []
+        self._handlers: WeakKeyDictionary[object, tuple[Callable, Callable]] = WeakKeyDictionary()
+
+    def __len__(self) -> int:
+        return len(self._handlers)
+
+    def subscribe(self, add_handler: AddPinsHandler, remove_handler: RemovePinsHandler):
+        self._handlers[add_handler.__self__] = (add_handler.__func__, remove_handler.__func__)
+
+    def unsubscribe(self, owner: object):
+        self._handlers.pop(owner, None)
 
     def add_pin(self, pin_name: str, pin_title: str):
-        for handler in self.add_handlers:
-            handler(pin_name, pin_title)
+        self.add_pins([(pin_name, pin_title)])
+
+    def add_pins(self, pins: list[tuple[str, str]]):
+        if not pins:
+            return
+        for owner, (add_handler, _) in list(self._handlers.items()):
+            add_handler(owner, pins)
+
+    def remove_pin(self, pin_name: str) -> list:
+        return self.remove_pins([pin_name])
+
+    def remove_pins(self, pin_names: list[str]) -> list:
+        removed = []
+        if not pin_names:
+            return removed
+        for owner, (_, remove_handler) in list(self._handlers.items()):
+            removed.extend(remove_handler(owner, pin_names))
+        return removed
@@ -3,8 +3,6 @@ from typing import Sequence
 from code_grav.nodes import Node
 from code_grav.space_types import BasePin
 
-_LAST_ID = 0
-
 
 def normalize_rect(rect):
     if rect.width < 0:
@@ -31,17 +29,6 @@ def get_common_center(nodes: list[Node]):
     return common_center_x, common_center_y
 
 
-def get_new_id() -> int:
-    global _LAST_ID
-    _LAST_ID += 1
-    return _LAST_ID
-
-
-def set_last_id(value: int):
-    global _LAST_ID
-    _LAST_ID = value
-
-
 def get_max_pin_id(pins: list[BasePin], prefix: str = '') -> int:
     max_int = 0
     prefix_len = len(prefix)
@@ -62,6 +49,8 @@ def generate_pos_pins(pins: Sequence[BasePin], height: int, top_offset: int) ->
     offset = - step * (total - 1) / 2
     for i, pin in enumerate(pins):
         pin.y = top_offset + offset + i * step
+    if pins:
+        pins[0].node.layout_version += 1
     return top_offset + height
 
 
@@ -0,0 +1,28 @@
+import os
+
+POLL_INTERVAL = 500
+
+
+class FileWatcher:
+    def __init__(self, filepath: str, interval: int = POLL_INTERVAL):
+        self.filepath = filepath
+        self.interval = interval
+        self._checked = 0
+        self._stat = self._read_stat()
+
+    def _read_stat(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.filepath)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def sync(self):
+        self._stat = self._read_stat()
+
+    def changed(self, now: int) -> bool:
+        if now - self._checked < self.interval:
+            return False
+        self._checked = now
+        stat = self._read_stat()
+        return stat is not None and stat != self._stat
@@ -0,0 +1,147 @@
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Callable
+from weakref import WeakSet
+
+from code_grav.history import NODE_SIZE, EDGE_SIZE
+from code_grav.ids import IdAllocator
+from code_grav.space_types import Node, SpaceProtocol
+
+BUDGET = 64 * 1024 * 1024
+
+# raises ValueError for a module that exists but cannot be read
+Loader = Callable[[str], tuple[SpaceProtocol, IdAllocator]]
+
+
+class Module:
+    def __init__(self, ref: str, path: str, space: SpaceProtocol | None, ids: IdAllocator, error: str | None = None):
+        self.ref = ref
+        self.path = path
+        # None when the module failed to load; error says why
+        self.space = space
+        self.ids = ids
+        self.error = error
+        # every node of the module is registered with its allocator; edges are
+        # counted as one per node, which is what generated and edited programs average
+        self.size = len(ids) * (NODE_SIZE + EDGE_SIZE)
+        # opened in the editor: may hold unsaved edits, so it is never evicted
+        self.pinned = False
+        self.interface: Interface | None = None
+
+
+class Interface:
+    # forwards pin edits made inside an opened module to every node that references it
+    def __init__(self, references: WeakSet):
+        self.references = references
+
+    def add_input_pins(self, pins: list[tuple[str, str]]):
+        for node in list(self.references):
+            node.add_input_pin_handler(pins)
+
+    def remove_input_pins(self, pin_names: list[str]) -> list:
+        return [pin for node in list(self.references) for pin in node.remove_input_pin_handler(pin_names)]
+
+    def add_output_pins(self, pins: list[tuple[str, str]]):
+        for node in list(self.references):
+            node.add_output_pin_handler(pins)
+
+    def remove_output_pins(self, pin_names: list[str]) -> list:
+        return [pin for node in list(self.references) for pin in node.remove_output_pin_handler(pin_names)]
+
+
+class Workspace:
+    def __init__(self, root: str, loader: Loader, budget: int = BUDGET):
+        self.root = root
+        self.budget = budget
+        self.size = 0
+        self.loads = 0
+        self._loader = loader
+        # evaluate_parallel resolves references from pool threads
+        self._lock = threading.RLock()
+        self._modules: OrderedDict[str, Module] = OrderedDict()
+        # nodes referencing each module, whether it is loaded or not
+        self._references: defaultdict[str, WeakSet[Node]] = defaultdict(WeakSet)
+
+    def __len__(self) -> int:
+        return len(self._modules)
+
+    def __contains__(self, ref: str) -> bool:
+        return self.resolve(ref) in self._modules
+
+    def resolve(self, ref: str) -> str:
+        return os.path.normpath(os.path.join(self.root, ref))
+
+    def relative(self, filepath: str) -> str:
+        return os.path.relpath(os.path.abspath(filepath), os.path.abspath(self.root))
+
+    def load(self, ref: str) -> Module:
+        with self._lock:
+            return self._load(ref)
+
+    def _load(self, ref: str) -> Module:
+        path = self.resolve(ref)
+        module = self._modules.get(path)
+        if module is not None:
+            self._modules.move_to_end(path)
+            return module
+        try:
+            space, ids = self._loader(path)
+        except ValueError as e:
+            # not cached, so a module that was half written is picked up once it is complete
+            return Module(ref, path, None, IdAllocator(), str(e))
+        module = Module(ref, path, space, ids)
+        self._modules[path] = module
+        self.size += module.size
+        self.loads += 1
+        self._evict()
+        return module
+
+    def open(self, ref: str) -> Module:
+        module = self.load(ref)
+        if module.error is not None:
+            return module
+        module.pinned = True
+        if module.interface is None:
+            # pinned modules stay loaded, so the subscription lives as long as the edits can happen
+            module.interface = Interface(self._references[module.path])
+            space = module.space
+            space.sync_input_pins.subscribe(module.interface.add_input_pins, module.interface.remove_input_pins)
+            space.sync_output_pins.subscribe(module.interface.add_output_pins, module.interface.remove_output_pins)
+            # the program may have been saved against an older interface of the module
+            module.interface.add_input_pins([(pin.name, pin.title) for pin in space.input_node.pins])
+            module.interface.add_output_pins([(pin.name, pin.title) for pin in space.output_node.pins])
+        return module
+
+    def reference(self, node: Node):
+        self._references[self.resolve(node.ref)].add(node)
+
+    def unreference(self, node: Node):
+        self._references[self.resolve(node.ref)].discard(node)
+
+    def pinned(self) -> list[Module]:
+        return [module for module in self._modules.values() if module.pinned]
+
+    def _evict(self):
+        # the most recently used module is the one being asked for, so it always stays
+        for path in list(self._modules)[:-1]:
+            if self.size <= self.budget:
+                break
+            module = self._modules[path]
+            if not module.pinned:
+                del self._modules[path]
+                self.size -= module.size
+
+
+_workspace: Workspace | None = None
+
+
+def current_workspace() -> Workspace:
+    if _workspace is None:
+        raise RuntimeError('CodeGrav: no workspace is open')
+    return _workspace
+
+
+def use_workspace(workspace: Workspace):
+    global _workspace
+    _workspace = workspace
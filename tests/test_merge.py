@@ -0,0 +1,198 @@
+import copy
+import json
+
+import pytest
+
+from code_grav import file_manager
+from code_grav.diff import diff_spaces
+from code_grav.ids import IdAllocator
+from code_grav.merge import flatten, main, merge3, renumber
+
+
+def const(node_id: int, value: str, x: int = 0, y: int = 0) -> dict:
+    return {'name': 'Const', 'id': node_id, 'x': x, 'y': y, 'value': value}
+
+
+def operator(node_id: int, value: str = '+', x: int = 0, y: int = 0) -> dict:
+    return {'name': 'Operator', 'id': node_id, 'x': x, 'y': y, 'value': value}
+
+
+def edge(start: int, start_pin: str, end: int, end_pin: str) -> dict:
+    return {'start': {'node_id': start, 'pin_name': start_pin}, 'end': {'node_id': end, 'pin_name': end_pin}}
+
+
+def program(nodes: list[dict], edges: list[dict], input_id: int = 1, output_id: int = 2, inputs: int = 1) -> dict:
+    return {
+        'nodes': [
+            {'name': 'Input', 'id': input_id, 'x': -200, 'y': 0,
+             'pins': [{'name': f'input{i}', 'title': str(i)} for i in range(1, inputs + 1)]},
+            {'name': 'Output', 'id': output_id, 'x': 200, 'y': 0, 'pins': [{'name': 'output1', 'title': '1'}]},
+            *nodes,
+        ],
+        'edges': edges,
+    }
+
+
+def base_program() -> dict:
+    return program(
+        [const(3, '1'), const(4, '2', x=50), operator(5, x=100)],
+        [edge(3, 'output', 5, 'first'), edge(4, 'output', 5, 'second'), edge(5, 'output', 2, 'output1')],
+    )
+
+
+def nodes_by_id(data: dict) -> dict[int, dict]:
+    return {node_id: node for node_id, (_, node) in flatten(data)[0].items()}
+
+
+def test_clean_merge():
+    base = base_program()
+    ours = copy.deepcopy(base)
+    ours['nodes'][2]['value'] = '10'
+    theirs = copy.deepcopy(base)
+    theirs['nodes'][3]['x'] = 75
+    theirs['nodes'][4]['value'] = '*'
+
+    result, conflicts = merge3(base, ours, theirs)
+
+    assert conflicts == []
+    nodes = nodes_by_id(result)
+    assert nodes[3]['value'] == '10'
+    assert nodes[4]['x'] == 75
+    assert nodes[5]['value'] == '*'
+    assert len(result['edges']) == 3
+
+
+def test_delete_modify_conflict():
+    base = base_program()
+    ours = copy.deepcopy(base)
+    del ours['nodes'][2]
+    ours['edges'] = [e for e in ours['edges'] if e['start']['node_id'] != 3]
+    theirs = copy.deepcopy(base)
+    theirs['nodes'][2]['value'] = '7'
+
+    result, conflicts = merge3(base, ours, theirs)
+
+    assert len(conflicts) == 1
+    assert 'deleted on one side and changed on the other' in conflicts[0]
+    assert nodes_by_id(result)[3]['value'] == '7'
+
+
+def test_unchanged_deletion_is_taken():
+    base = base_program()
+    ours = copy.deepcopy(base)
+    del ours['nodes'][2]
+    ours['edges'] = [e for e in ours['edges'] if e['start']['node_id'] != 3]
+    theirs = copy.deepcopy(base)
+
+    result, conflicts = merge3(base, ours, theirs)
+
+    assert conflicts == []
+    assert 3 not in nodes_by_id(result)
+    assert all(e['start']['node_id'] != 3 for e in result['edges'])
+
+
+def test_same_id_additions_are_renumbered():
+    base = base_program()
+    ours = copy.deepcopy(base)
+    ours['nodes'].append(const(6, 'ours'))
+    theirs = copy.deepcopy(base)
+    theirs['nodes'].append(const(6, 'theirs'))
+    theirs['nodes'].append(operator(7, '-'))
+    theirs['edges'].append(edge(6, 'output', 7, 'first'))
+
+    result, conflicts = merge3(base, ours, theirs)
+
+    assert conflicts == []
+    nodes = nodes_by_id(result)
+    assert nodes[6]['value'] == 'ours'
+    # both sides counted from 5, so theirs moves past every id either side used
+    assert nodes[8]['value'] == 'theirs'
+    assert nodes[7]['value'] == '-'
+    assert edge(8, 'output', 7, 'first') in result['edges']
+
+
+def test_identical_additions_are_kept_once():
+    base = base_program()
+    ours = copy.deepcopy(base)
+    ours['nodes'].append(const(6, 'same'))
+    theirs = copy.deepcopy(ours)
+
+    result, conflicts = merge3(base, ours, theirs)
+
+    assert conflicts == []
+    assert [node['id'] for node in result['nodes']].count(6) == 1
+
+
+def test_node_moved_into_subspace_keeps_changes_from_the_other_side():
+    base = base_program()
+    ours = copy.deepcopy(base)
+    operator_node = ours['nodes'].pop(4)
+    ours['nodes'].append({
+        'name': 'SubSpace', 'id': 8, 'x': 100, 'y': 0,
+        'input_pins': [{'name': 'input1', 'title': '1'}, {'name': 'input2', 'title': '2'}],
+        'output_pins': [{'name': 'output1', 'title': '1'}],
+        'space': program(
+            [operator_node],
+            [edge(6, 'input1', 5, 'first'), edge(6, 'input2', 5, 'second'), edge(5, 'output', 7, 'output1')],
+            input_id=6, output_id=7, inputs=2,
+        ),
+    })
+    ours['edges'] = [edge(3, 'output', 8, 'input1'), edge(4, 'output', 8, 'input2'), edge(8, 'output1', 2, 'output1')]
+    theirs = copy.deepcopy(base)
+    theirs['nodes'][4]['value'] = '*'
+
+    result, conflicts = merge3(base, ours, theirs)
+
+    assert conflicts == []
+    nodes = flatten(result)[0]
+    path, data = nodes[5]
+    assert path == (8,)
+    assert data['value'] == '*'
+    assert 5 not in {node['id'] for node in result['nodes']}
+
+
+def test_renumber_rewrites_paths_and_edges():
+    data = program(
+        [{'name': 'SubSpace', 'id': 3, 'x': 0, 'y': 0, 'input_pins': [], 'output_pins': [],
+          'space': {'nodes': [const(4, '1'), operator(5)], 'edges': [edge(4, 'output', 5, 'first')]}}],
+        [],
+    )
+    nodes, edges = flatten(data)
+
+    nodes, edges = renumber(nodes, edges, {3: 10, 4: 11})
+
+    assert nodes[10][0] == ()
+    assert nodes[11] == ((10,), const(11, '1'))
+    assert nodes[5][0] == (10,)
+    assert list(edges) == [((10,), (11, 'output', 5, 'first'))]
+
+
+def test_diff_matches_renumbered_nodes():
+    old = base_program()
+    new = copy.deepcopy(old)
+    new['nodes'][3]['id'] = 9
+    new['edges'][1] = edge(9, 'output', 5, 'second')
+
+    diff = diff_spaces(old, new, rename=True)
+
+    assert diff.renamed == {4: 9}
+    assert diff.added == [] and diff.removed == []
+    assert diff.added_edges == [] and diff.removed_edges == []
+
+
+def test_merge_reads_compressed_files(tmp_path):
+    base = base_program()
+    ours = copy.deepcopy(base)
+    ours['nodes'][2]['value'] = '10'
+    paths = []
+    for name, data in (('base', base), ('ours', ours), ('theirs', base)):
+        path = str(tmp_path / f'{name}.cg.gz')
+        file_manager.save(file_manager.dict_to_space(data, IdAllocator()), path)
+        paths.append(path)
+    out = tmp_path / 'out.cg'
+
+    with pytest.raises(SystemExit) as exit_info:
+        main(['merge', *paths, '-o', str(out)])
+
+    assert exit_info.value.code == 0
+    assert nodes_by_id(json.loads(out.read_text()))[3]['value'] == '10'